@@ -1,20 +1,54 @@
+from __future__ import print_function
+
 import argparse
 import re
+import shutil
+import sys
+import tempfile
 import itertools as it
-from collections import defaultdict
+
+import numpy as np
 
 from .pyeval import Family
-from .evalfam import EvalFamily
-from geneimpacts import Effect
+from .npeval import CohortEvaluator, ModelsEvaluator
+from .annotation import GeneFinder, header_keys
+from .regions import read_bed, read_genes, gene_intervals, merge
+from .prefilter import Prefilter, carrier_columns
+from .pedigree import PedError, read_ped, cached_read_ped
+from .writer import BackgroundWriter
+from .stats import Stats
 
 def main(args):
 
     p = argparse.ArgumentParser()
-    p.add_argument("--inheritance_model", choices=("comp_het", "auto_dom", "auto_rec", "de_novo"))
+    p.add_argument("--inheritance_model", type=models_arg,
+                   help="one of %s or a comma-separated list of these (except comp_het) "
+                        "to run in 1 pass" % ", ".join(models))
     p.add_argument("--min-depth", type=int, default=5)
     p.add_argument("--min-gq", type=int, default=5)
     p.add_argument("--min-kindreds", type=int, default=0)
     p.add_argument("--min-severity", default=None, choices=("MED", "HIGH"))
+    p.add_argument("--processes", type=int, default=1,
+                   help="number of processes. >1 requires an indexed (.tbi/.csi) VCF")
+    p.add_argument("--regions", help="BED file of regions to limit to. requires an indexed VCF")
+    p.add_argument("--genes", help="genes to limit to as a file with 1 per line or a comma-separated "
+                                   "list. requires an indexed VCF and --gene-intervals")
+    p.add_argument("--gene-intervals", help="BED file with the gene name in the 4th column")
+    p.add_argument("--pass-only", action="store_true", help="skip records with a FILTER other than PASS")
+    p.add_argument("--max-ac", type=int, help="skip records with INFO/AC above this")
+    p.add_argument("--max-af", type=float, help="skip records with INFO/AF above this")
+    p.add_argument("--popfreq-field", help="INFO field with a population allele frequency (e.g. gnomad_af)")
+    p.add_argument("--max-popfreq", type=float, help="skip records with --popfreq-field above this")
+    p.add_argument("-o", "--output", default="-",
+                   help="output VCF. ends with .gz for bgzipped VCF or .bcf for BCF (default: stdout)")
+    p.add_argument("--output-threads", type=int, default=0,
+                   help="extra threads to compress the output (for .gz or .bcf)")
+    p.add_argument("--stats", metavar="FILE",
+                   help="write timings, counts and peak memory of the run as JSON to FILE")
+    p.add_argument("--profile", action="store_true",
+                   help="with --stats, sample the lines being run and add the most common")
+    p.add_argument("--ped-cache", metavar="DIR",
+                   help="keep the parsed pedigree in DIR for later runs with the same PED and VCF samples")
     p.add_argument("ped")
     p.add_argument("vcf")
 
@@ -27,86 +61,453 @@ def main(args):
     elif severity == "HIGH":
         severity = ("HIGH", )
 
-    run(a.inheritance_model, a.ped, a.vcf, a.min_depth, a.min_gq, a.min_kindreds, severity)
+    intervals = None
+    if a.regions or a.genes:
+        intervals = []
+        if a.regions:
+            intervals.extend(read_bed(a.regions))
+        if a.genes:
+            if not a.gene_intervals:
+                p.error("--genes requires --gene-intervals")
+            intervals.extend(gene_intervals(a.gene_intervals, read_genes(a.genes)))
+
+    if (a.popfreq_field is None) != (a.max_popfreq is None):
+        p.error("--popfreq-field and --max-popfreq must be used together")
+    filters = dict(pass_only=a.pass_only, max_ac=a.max_ac, max_af=a.max_af,
+                   popfreq_field=a.popfreq_field, max_popfreq=a.max_popfreq)
+
+    stats = Stats(profile=a.profile) if a.stats else None
+    run(a.inheritance_model, a.ped, a.vcf, a.min_depth, a.min_gq, a.min_kindreds, severity,
+        processes=a.processes, intervals=intervals, filters=filters, output=a.output,
+        output_threads=a.output_threads, stats=stats, ped_cache=a.ped_cache)
+    if stats is not None:
+        stats.write(a.stats)
+
+
+models = ("comp_het", "auto_dom", "auto_rec", "de_novo", "x_rec", "x_dom", "x_denovo")
+
+
+def models_arg(value):
+    chosen = value.split(",")
+    bad = [m for m in chosen if m not in models]
+    if bad:
+        raise argparse.ArgumentTypeError("invalid model(s): %s (choose from %s)" % (",".join(bad), ", ".join(models)))
+    if len(chosen) > 1 and "comp_het" in chosen:
+        raise argparse.ArgumentTypeError("comp_het can't be combined with other models")
+    return value
 
 
-def run(inheritance_model, ped, vcf, min_depth, min_gq, min_kindreds, severity):
-    from cyvcf2 import VCF, Writer
+def setup(inheritance_model, ped, vcf, min_depth, min_gq, severity, filters=None, ped_cache=None):
+    """
+    open the vcf (with the inheritance INFO fields added to the header) and
+    return it along with the CohortEvaluator for the model, the function
+    used to get the gene of a variant, the families and the Prefilter.
+    `filters` has the keyword arguments for the Prefilter. With `ped_cache`,
+    the pedigree is loaded from (or saved to) that directory.
+    """
+    from cyvcf2 import VCF
     vcf = VCF(vcf, samples="-")
 
-    annos = {}
-    if "ANN" in vcf:
-        desc = vcf["ANN"]["Description"]
-        parts = [x.strip("\"'") for x in re.split("\s*\|\s*", desc.split(":", 1)[1].strip('" '))]
-        annos["ANN"] = parts
-    if "EFF" in vcf:
-        desc = vcf["EFF"]["Description"]
-        parts = [x.strip(" [])'(\"") for x in re.split("\||\(", desc.split(":", 1)[1].strip())]
-        annos["EFF"] = parts
-    if "CSQ" in vcf:
-        desc = vcf["CSQ"]["Description"]
-        parts = [x.strip(" [])'(\"") for x in re.split("\||\(", desc.split(":", 1)[1].strip())]
-        annos["CSQ"] = parts
-
-    vcf.update(id="inheritance", type="String", number="1", description="inheritance stuffs")
-    out = Writer("-", vcf)
+    annos = header_keys(vcf)
+
+    chosen = inheritance_model.split(",")
+    if len(chosen) == 1:
+        vcf.update(id="inheritance", type="String", number="1", description="inheritance stuffs")
+    else:
+        vcf.update(id="inheritance", type="String", number="1",
+                   description="gene:family/model|model,... for the models %s" % inheritance_model)
+    if inheritance_model == "comp_het":
+        vcf.update(id="comp_het", type="String", number=".",
+                   description="compound het pairs as family/CHROM:POS:REF:ALT of the other site/priority")
 
     vcf_order = dict((n, i) for i, n in (enumerate(vcf.samples)))
-    fams = Family.from_ped(ped, order=vcf_order)
-    for fam_id in fams:
-        fams[fam_id] = (EvalFamily(fams[fam_id]), [s._i for s in fams[fam_id].subjects])
-
-    def get_gene(variant):
-        for anno in annos:
-            curr_anno = variant.INFO.get(anno)
-            if curr_anno is None:
-                continue
-            consequences = curr_anno.split(",")
-            effs = (Effect.new(anno, c, annos[anno]) for c in consequences)
-            # limit to requested severity
-            if severity is not None:
-                effs = [e for e in effs if e.impact_severity in severity]
-            effs = sorted(effs, reverse=True)
-            for eff in effs:
-                if eff.gene:
-                    return eff.gene
+    try:
+        if ped_cache:
+            pedigree = cached_read_ped(ped, vcf.samples, ped_cache)
+        else:
+            pedigree = read_ped(ped, order=vcf_order)
+        fams = Family.from_pedigree(pedigree)
+    except PedError as e:
+        sys.exit(str(e))
+    # this dispatches to fam.auto_rec/auto_dom/de_novo/, etc. by the string
+    # in inheritance model for every family at once.
+    if len(chosen) == 1:
+        cohort = CohortEvaluator(fams, inheritance_model, min_depth=min_depth, min_gq=min_gq)
+    else:
+        cohort = ModelsEvaluator(fams, chosen, min_depth=min_depth, min_gq=min_gq)
+
+    get_gene = GeneFinder(annos, severity)
+
+    carriers = carrier_columns(fams, chosen, min_depth=min_depth, min_gq=min_gq)
+    prefilter = Prefilter(carriers=carriers, **(filters or {}))
+
+    return vcf, cohort, get_gene, fams, prefilter
+
+
+def gene_groups(variants, cohort, get_gene, prefilter=None):
+    """
+    yield (gene, matches) for each run of variants with the same gene where
+    matches iterates over (variant, family_ids, labels) for the variants
+    that matched the model in at least 1 family. labels are the family ids
+    or, with several models, family/model|model. As with itertools.groupby,
+    the matches must be used before moving to the next group.
 
+    Records removed by the FILTER and INFO checks of `prefilter` are dropped
+    before grouping as if they weren't in the vcf. The carrier check only
+    skips evaluating a record so it doesn't change the groups.
+    """
+    if prefilter is not None:
+        variants = prefilter.sites(variants)
     # TODO: more flexible groupby
-    for gene, variants in it.groupby(vcf, get_gene):
-
-        matching_fams = defaultdict(list)
-        saved_vars = []
-        uniq_fams = []
-
-        for i, variant in enumerate(variants):
-            saved_vars.append(variant)
-
-            for family_id, (fam, idxs) in fams.items():
-                fam.gt_types = variant.gt_types[idxs]
-                fam.gt_depths = variant.gt_depths[idxs]
-                fam.gt_quals = variant.gt_quals[idxs]
-                # this dispatches to fam.auto_rec/auto_dom/de_novo/, etc. by the string
-                # in inheritance model
-                res = getattr(fam, inheritance_model)(min_depth=min_depth, min_gq=min_gq)
-
-                # matched the inheritance model.
-                if res: # can add custom logic here, e.g. and v.call_rate > 0.9:
-                    matching_fams[i].append(family_id)
-                    uniq_fams.append(family_id)
-
-        if 0 < len(set(uniq_fams)) >= min_kindreds:
-
-            if inheritance_model == 'comp_het':
-                # TODO: idxs = matching_fams.keys()
-                # run idxs[1:] vs idxs[:-1] for variants
-                pass
-            for i, family_ids in sorted(matching_fams.items()):
-                variant = saved_vars[i]
-                variant.INFO["inheritance"] = "%s:%s" % (gene or 'Intergenic', ",".join(set(family_ids)))
+    for gene, variants in it.groupby(variants, get_gene):
+        yield gene, _matches(variants, cohort, prefilter)
+
+
+def _matches(variants, cohort, prefilter=None):
+    for variant in variants:
+        if prefilter is not None and not prefilter.carrier(variant):
+            continue
+        res = cohort(variant.gt_types, gt_depths=variant.gt_depths,
+                     gt_quals=variant.gt_quals)
+
+        # matched the inheritance model.
+        if res.ndim == 2:
+            # models x families
+            hits = np.flatnonzero(res.any(axis=0))
+            family_ids = [cohort.family_ids[k] for k in hits]
+            labels = ["%s/%s" % (cohort.family_ids[k], "|".join(cohort.models[j] for j in np.flatnonzero(res[:, k])))
+                      for k in hits]
+        else:
+            family_ids = labels = [cohort.family_ids[k] for k in np.flatnonzero(res)] # can add custom logic here, e.g. and v.call_rate > 0.9:
+        if family_ids:
+            yield variant, family_ids, labels
+
+
+def annotate(variant, gene, labels):
+    variant.INFO["inheritance"] = "%s:%s" % (gene or 'Intergenic', ",".join(labels))
+
+
+def spooled(groups, spool, site=None):
+    """
+    write the annotated matching records of each group to the `spool` file
+    and yield (gene, families, pieces, sites) where families is the set of
+    matching families and pieces is [(spool path, start, end)] giving the
+    byte range of the records. Only the set of families is kept in memory so
+    memory use doesn't depend on the number of variants in a gene or the
+    number of samples.
+
+    For comp_het, `site(variant, family_ids)` gives what is needed to pair
+    the record with others in the gene. The records are then written without
+    annotation and sites has the value for each one.
+    """
+    for gene, matches in groups:
+        start, families, sites = spool.tell(), set(), []
+        for variant, family_ids, labels in matches:
+            if site is None:
+                annotate(variant, gene, labels)
+            else:
+                sites.append(site(variant, family_ids))
+            spool.write(str(variant).encode())
+            families.update(family_ids)
+        yield gene, families, [(spool.name, start, spool.tell())], sites
+
+
+def read_pieces(out, pieces):
+    """yield the records in the byte ranges of the spool files."""
+    for path, start, end in pieces:
+        if start == end: continue
+        with open(path, "rb") as fh:
+            fh.seek(start)
+            while fh.tell() < end:
+                yield out.variant_from_string(fh.readline().decode().rstrip("\n"))
+
+
+class Pairing(object):
+    """
+    find compound hets among the sites of a gene that passed the comp_het
+    filter. Each family is copied with its samples indexed by their position
+    in the family so that a site only keeps the genotypes of the families it
+    passed for.
+    """
+
+    def __init__(self, fams):
+        self.families = {}
+        for family_id, fam in fams.items():
+            idxs = fam.index()
+            local = Family.from_family(fam)
+            for i, s in enumerate(local.subjects):
+                s._i = i
+            self.families[family_id] = (local, idxs)
+
+    def site(self, variant, family_ids):
+        """
+        the id of the variant and, for each family, the genotypes, bases and
+        phases of its samples.
+        """
+        alt = variant.ALT[0] if variant.ALT else None
+        key = "%s:%d:%s:%s" % (variant.CHROM, variant.POS, variant.REF, alt)
+        gt_types, gt_bases, gt_phases = variant.gt_types, variant.gt_bases, variant.gt_phases
+        fams = []
+        for family_id in family_ids:
+            idxs = self.families[family_id][1]
+            fams.append((family_id, gt_types[idxs].tolist(), gt_bases[idxs].tolist(),
+                         gt_phases[idxs].tolist()))
+        return key, variant.REF, alt, fams
+
+    def pairs(self, sites):
+        """
+        return {site index: [(family_id, other site id, priority)]} for the
+        pairs of sites that are compound het in a family. Only sites that
+        passed comp_het for a family are paired for that family.
+        """
+        by_family = {}
+        for i, (_, _, _, fams) in enumerate(sites):
+            for f in fams:
+                by_family.setdefault(f[0], []).append((i, f[1:]))
 
+        found = {}
+        for family_id, fsites in by_family.items():
+            fam = self.families[family_id][0]
+            for (i, (t1, b1, p1)), (j, (t2, b2, p2)) in it.combinations(fsites, 2):
+                # comp_het_pair phases the bases in place.
+                res = fam.comp_het_pair(t1, list(b1), t2, list(b2), list(p1), list(p2),
+                                        ref1=sites[i][1], alt1=sites[i][2],
+                                        ref2=sites[j][1], alt2=sites[j][2])
+                if not res['candidate']: continue
+                found.setdefault(i, []).append((family_id, sites[j][0], res['priority']))
+                found.setdefault(j, []).append((family_id, sites[i][0], res['priority']))
+        return found
+
+
+def write_group(out, gene, families, pieces, sites, min_kindreds, pairing=None):
+    """
+    write the records of a gene if enough families matched. For comp_het
+    only records that are part of a pair are written and families are those
+    with a pair.
+    """
+    if pairing is None:
+        if 0 < len(families) >= min_kindreds:
+            for variant in read_pieces(out, pieces):
                 out.write_record(variant)
+        return
+
+    found = pairing.pairs(sites) if len(sites) > 1 else {}
+    if not 0 < len(set(p[0] for ps in found.values() for p in ps)) >= min_kindreds:
+        return
+    for i, variant in enumerate(read_pieces(out, pieces)):
+        if i not in found: continue
+        family_ids = []
+        for p in found[i]:
+            if p[0] not in family_ids: family_ids.append(p[0])
+        annotate(variant, gene, family_ids)
+        variant.INFO["comp_het"] = ",".join("%s/%s/%s" % p for p in found[i])
+        out.write_record(variant)
+
+
+def run(inheritance_model, ped, vcf, min_depth, min_gq, min_kindreds, severity, processes=1,
+        intervals=None, filters=None, output="-", output_threads=0, stats=None, ped_cache=None):
+    """
+    `intervals` is an optional list of (chrom, start, end) to limit to
+    using the index of the vcf. `filters` has the keyword arguments for the
+    Prefilter; when any is used (or with `stats`) the number of records
+    removed by each check is written to stderr.
+    Records are written to `output` from a separate thread and, for
+    compressed output, `output_threads` more threads compress them.
+    If `stats` is a Stats, it collects the timings and counts of the run.
+    `ped_cache` is a directory to keep the parsed pedigree in (see
+    inheritance.pedigree.cached_read_ped).
+    """
+    from cyvcf2 import Writer
+    params = (inheritance_model, ped, vcf, min_depth, min_gq, severity, filters, ped_cache)
+    vcf, cohort, get_gene, fams, prefilter = setup(*params)
+    writer = Writer(output, vcf)
+    if output_threads > 0:
+        writer.set_threads(output_threads)
+    if stats is not None:
+        stats.prefilter = prefilter
+        get_gene, cohort, writer = stats.gene(get_gene), stats.cohort(cohort), stats.writer(writer)
+    pairing = Pairing(fams) if inheritance_model == 'comp_het' else None
+    try:
+        with BackgroundWriter(writer) as out:
+            _run(out, params, vcf, cohort, get_gene, prefilter, pairing, min_kindreds,
+                 processes, intervals, stats)
+    finally:
+        if stats is not None:
+            stats.stop()
+        # the carrier check is always on so only report when asked for.
+        if prefilter.checks or stats is not None:
+            prefilter.report()
+
+
+def _run(out, params, vcf, cohort, get_gene, prefilter, pairing, min_kindreds, processes,
+         intervals, stats=None):
+    if intervals is not None:
+        regions = merge(intervals, vcf.seqnames)
+        if regions and not indexed(vcf, regions[0]):
+            raise SystemExit("--regions and --genes require an indexed VCF: %s" % params[2])
+        if processes > 1:
+            return run_sharded(out, params, regions, min_kindreds, processes, pairing, prefilter,
+                               stats)
+        variants = it.chain.from_iterable(fetch(vcf, r) for r in regions)
+
+    elif processes > 1:
+        regions = list(shards(vcf, 8 * processes))
+        if regions and indexed(vcf, regions[0]):
+            return run_sharded(out, params, regions, min_kindreds, processes, pairing, prefilter,
+                               stats)
+        print("not using %d processes: %s has %s" % (processes, params[2],
+              "no index" if regions else "no contigs in its header"), file=sys.stderr)
+        variants = vcf
+    else:
+        variants = vcf
+
+    if stats is not None:
+        variants = stats.timed(variants, "decode")
+    groups = gene_groups(variants, cohort, get_gene, prefilter)
+    if min_kindreds <= 1 and pairing is None:
+        # any match is reported so there's no need to wait for the whole gene.
+        for gene, matches in groups:
+            for variant, family_ids, labels in matches:
+                annotate(variant, gene, labels)
+                out.write_record(variant)
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".vcf") as spool:
+        for gene, families, pieces, sites in spooled(groups, spool, pairing and pairing.site):
+            spool.flush()
+            write_group(out, gene, families, pieces, sites, min_kindreds, pairing)
+            # only the current gene is needed.
+            spool.seek(0)
+            spool.truncate()
+
+
+def fetch(vcf, region):
+    """
+    the records of an indexed vcf in a (chrom, start, end, first) region
+    that start at or after `first`. end can be None for the rest of the
+    contig.
+    """
+    chrom, start, end, first = region
+    query = "%s:%d" % (chrom, start) if end is None else "%s:%d-%d" % (chrom, start, end)
+    return (v for v in vcf(query) if v.POS >= first)
+
+
+def indexed(vcf, region):
+    try:
+        next(fetch(vcf, region), None)
+    except Exception:
+        return False
+    return True
+
+
+def shards(vcf, n):
+    """
+    split the contigs of `vcf` into about `n` regions of similar length as
+    (chrom, start, end, first) with 1-based inclusive coordinates. The last
+    region of each contig is open-ended (end is None). Records that start
+    before a region overlap it but belong to the previous one so first is
+    the start.
+    """
+    try:
+        lengths = list(zip(vcf.seqnames, vcf.seqlens))
+    except Exception:
+        # no lengths in the header; 1 region per contig.
+        lengths = [(c, 1) for c in vcf.seqnames]
+    size = max(1, sum(l for _, l in lengths) // n + 1)
+    for chrom, length in lengths:
+        starts = list(range(1, length + 1, size)) or [1]
+        for start, nxt in zip(starts, starts[1:] + [None]):
+            yield chrom, start, None if nxt is None else nxt - 1, start
+
+
+_worker = {}
+
+def _init_worker(params, stats=None, spool_dir=None):
+    vcf, cohort, get_gene, fams, prefilter = setup(*params)
+    pairing = Pairing(fams) if params[0] == 'comp_het' else None
+    _worker['setup'] = vcf, cohort, get_gene, prefilter, pairing and pairing.site
+    # keyword arguments for a Stats for each shard.
+    _worker['stats'] = stats
+    _worker['spool_dir'] = spool_dir
+
+
+def _run_shard(region):
+    vcf, cohort, get_gene, prefilter, site = _worker['setup']
+    variants = fetch(vcf, region)
+    stats = None
+    if _worker['stats'] is not None:
+        stats = Stats(**_worker['stats'])
+        variants = stats.timed(variants, "decode")
+        cohort, get_gene = stats.cohort(cohort), stats.gene(get_gene)
+    seen, counts = prefilter.seen, dict(prefilter.counts)
+    # the parent reads the records from the spool and removes it (and the
+    # directory it's in).
+    with tempfile.NamedTemporaryFile(suffix=".vcf", dir=_worker['spool_dir'], delete=False) as spool:
+        # groups without matches are kept so that only adjacent groups of
+        # neighboring shards are merged.
+        groups = list(spooled(gene_groups(variants, cohort, get_gene, prefilter), spool, site))
+    # the prefilter counts for this shard only.
+    counts = dict((k, v - counts[k]) for k, v in prefilter.counts.items())
+    if stats is not None:
+        stats.stop()
+        stats = stats.as_dict()
+    return spool.name, groups, (prefilter.seen - seen, counts), stats
+
+
+def merge_groups(shard_groups):
+    """
+    join the last group of a shard with the first group of the next when
+    they have the same gene so that the groups are the same as those from a
+    single pass over the vcf.
+    """
+    last = None
+    for groups in shard_groups:
+        for gene, families, pieces, sites in groups:
+            if last is not None and last[0] == gene:
+                last[1].update(families)
+                last[2].extend(pieces)
+                last[3].extend(sites)
+                continue
+            if last is not None:
+                yield last
+            last = (gene, set(families), list(pieces), list(sites))
+    if last is not None:
+        yield last
+
+
+def run_sharded(out, params, regions, min_kindreds, processes, pairing=None, prefilter=None,
+                stats=None):
+    """
+    run the regions in a pool of processes and write the results in order.
+    Output is the same as for a single process. The counts of the workers
+    are added to `prefilter` and their statistics to `stats`. On an error
+    the workers are stopped and all of their spools are removed.
+    """
+    import multiprocessing as mp
+    opts = None if stats is None else dict(profile=stats.profiler is not None)
+    spool_dir = tempfile.mkdtemp(prefix="inheritance-")
+    pool = mp.Pool(processes, _init_worker, (params, opts, spool_dir))
+
+    def shard_groups():
+        for _, groups, counts, shard_stats in pool.imap(_run_shard, regions):
+            if prefilter is not None:
+                prefilter.update(*counts)
+            if stats is not None:
+                stats.add(shard_stats)
+            yield groups
+
+    try:
+        for gene, families, pieces, sites in merge_groups(shard_groups()):
+            write_group(out, gene, families, pieces, sites, min_kindreds, pairing)
+        pool.close()
+    except BaseException:
+        # don't wait for the shards that are left.
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        shutil.rmtree(spool_dir, ignore_errors=True)
 
 
 if __name__ == "__main__":
-    import sys
     main(sys.argv[1:])
@@ -0,0 +1,103 @@
+"""
+Order the clauses of a model by how often they pass on the data at hand.
+
+For the first `n` variants every clause of the (simplified) filter is also
+evaluated on its own and the number of times it passes is kept. The operands
+of each and are then ordered so that the clause most likely to reject is
+checked first (and the operands of each or so that the clause most likely to
+accept is first) and the reordered filter is compiled. The learned pass rates
+can be dumped and sent back in for later runs on the same cohort.
+
+>>> from inheritance import Sample, Family, EvalFamily
+>>> mom, dad, kid = Sample('mom', False), Sample('dad', False), Sample('kid', True)
+>>> kid.mom, kid.dad = mom, dad
+>>> efam = EvalFamily(Family([mom, dad, kid], 'trio'))
+>>> efam.gt_depths = [20, 20, 20]
+>>> a = Adaptive(efam, 'auto_rec', kwargs=dict(min_depth=10), n=2)
+>>> print(a.filter)
+(gt_types[kid] == 3) and (gt_types[mom] == 1) and (gt_types[dad] == 1) and (gt_types[mom] != 3) and (gt_types[dad] != 3) and (gt_depths[kid] >= 10) and (gt_depths[mom] >= 10) and (gt_depths[dad] >= 10)
+>>> a(gt_types=[1, 0, 0]), a(gt_types=[1, 0, 3])
+(False, False)
+>>> print(a.filter)
+(gt_types[dad] == 1) and (gt_types[kid] == 3) and (gt_types[mom] == 1) and (gt_types[mom] != 3) and (gt_types[dad] != 3) and (gt_depths[kid] >= 10) and (gt_depths[mom] >= 10) and (gt_depths[dad] >= 10)
+>>> a.rates['(gt_types[kid] == 3)']
+0.5
+"""
+from __future__ import print_function
+
+import json
+
+from .evalfam import Prepared
+from .expr import Node, Ref, reorder
+
+
+class Adaptive(Prepared):
+    """
+    A Prepared model that learns the order of its clauses over the first `n`
+    calls. `rates` maps clauses (as strings) to their pass rate, e.g. from
+    `dump` of an earlier run; if it covers every clause, no learning is done.
+    """
+
+    __slots__ = ('n', 'rates', 'seen', 'counts', 'clauses')
+
+    def __init__(self, efam, model, args=(), kwargs=None, n=1000, rates=None):
+        self.n = n
+        self.rates = dict(rates or {})
+        Prepared.__init__(self, efam, model, args, kwargs)
+
+    def _use(self, flt):
+        self.clauses, self.counts, self.seen = [], None, 0
+        node = getattr(flt, 'node', None)
+        if node is not None:
+            klass = type(flt)
+            for sub in _subexpressions(node):
+                c = klass.render(sub)
+                self.clauses.append((sub, "(%s)" % c, compile(c, "<clause>", "eval")))
+        if all(c[1] in self.rates for c in self.clauses):
+            flt = self._reordered(flt)
+        else:
+            self.counts = [0] * len(self.clauses)
+        Prepared._use(self, flt)
+
+    def _reordered(self, flt):
+        rates = dict((c[0], self.rates.get(c[1], 0.5)) for c in self.clauses)
+        if not rates:
+            return flt
+        return type(flt).render(reorder(flt.node, rates.__getitem__))
+
+    def __call__(self, **arrays):
+        env = self._update(arrays)
+        if self.counts is None:
+            return eval(self.code, env)
+        for i, c in enumerate(self.clauses):
+            if eval(c[2], env):
+                self.counts[i] += 1
+        self.seen += 1
+        res = eval(self.code, env)
+        if self.seen >= self.n:
+            for c, count in zip(self.clauses, self.counts):
+                self.rates[c[1]] = count / float(self.seen)
+            self.counts = None
+            Prepared._use(self, self._reordered(self.filter))
+        return res
+
+    def dump(self, fh):
+        """write the learned pass rates as JSON."""
+        json.dump(self.rates, fh, indent=1, sort_keys=True)
+
+    @classmethod
+    def load(klass, fh):
+        """read pass rates written by `dump` to send as `rates`."""
+        return json.load(fh)
+
+
+def _subexpressions(node):
+    seen = []
+    def visit(n):
+        if not isinstance(n, Node) or isinstance(n, Ref) or n in seen:
+            return
+        seen.append(n)
+        for a in n.args:
+            visit(a)
+    visit(node)
+    return seen
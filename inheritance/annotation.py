@@ -0,0 +1,138 @@
+"""
+Get the gene of a variant from its ANN (snpEff), EFF (old snpEff) or CSQ
+(VEP) annotation.
+
+The gene is that of the most severe effect as ordered by geneimpacts, but
+most annotations name a single gene so only the gene column (and the
+consequence column when limiting by impact) of each effect is read and the
+full effects are only parsed and sorted when effects name different genes.
+Results are kept by the annotation string since neighboring variants often
+have the same one.
+
+>>> keys = ['Allele', 'Annotation', 'Annotation_Impact', 'Gene_Name', 'Transcript_BioType']
+>>> genes = GeneFinder({'ANN': keys})
+>>> genes.gene({'ANN': 'G|missense_variant|MODERATE|BRCA2|protein_coding,'
+...                    'G|upstream_gene_variant|MODIFIER|BRCA2|protein_coding'})
+'BRCA2'
+>>> genes.gene({'ANN': 'G|missense_variant|MODERATE|BRCA2|protein_coding,'
+...                    'G|stop_gained|HIGH|ZAR1L|protein_coding'})
+'ZAR1L'
+>>> GeneFinder({'ANN': keys}, severity=('HIGH',)).gene({'ANN': 'G|missense_variant|MODERATE|BRCA2|protein_coding'})
+"""
+import re
+
+from geneimpacts import Effect
+
+# the columns that geneimpacts uses for the gene and the consequence.
+gene_columns = {'ANN': ('Gene_Name',), 'EFF': ('Gene_Name',),
+                'CSQ': ('SYMBOL', 'HGNC', 'Gene')}
+consequence_columns = {'ANN': 'Annotation', 'EFF': 'Effect', 'CSQ': 'Consequence'}
+
+
+def _split_eff(effect, _patt=re.compile(r"\||\(")):
+    return _patt.split(effect.rstrip(")"))
+
+
+def header_keys(vcf):
+    """
+    return {annotation: [column names]} for the ANN, EFF and CSQ fields in
+    the header of a cyvcf2.VCF.
+    """
+    annos = {}
+    if "ANN" in vcf:
+        desc = vcf["ANN"]["Description"]
+        parts = [x.strip("\"'") for x in re.split(r"\s*\|\s*", desc.split(":", 1)[1].strip('" '))]
+        annos["ANN"] = parts
+    if "EFF" in vcf:
+        desc = vcf["EFF"]["Description"]
+        parts = [x.strip(" [])'(\"") for x in re.split(r"\||\(", desc.split(":", 1)[1].strip())]
+        annos["EFF"] = parts
+    if "CSQ" in vcf:
+        desc = vcf["CSQ"]["Description"]
+        parts = [x.strip(" [])'(\"") for x in re.split(r"\||\(", desc.split(":", 1)[1].strip())]
+        annos["CSQ"] = parts
+    return annos
+
+
+class GeneFinder(object):
+    """
+    Callable that returns the gene of a cyvcf2 Variant. `annos` is
+    {annotation: [column names]} (see header_keys) and `severity` limits
+    the effects to those with an impact in e.g. ('MED', 'HIGH').
+    """
+
+    def __init__(self, annos, severity=None, cache_size=10000):
+        self.annos = annos
+        self.severity = severity
+        self.cache_size = cache_size
+        self.cache = {}
+        # impact of each consequence column value.
+        self.impacts = {}
+        self.columns = {}
+        for anno, keys in annos.items():
+            gene = next((keys.index(k) for k in gene_columns.get(anno, ()) if k in keys), None)
+            csq = consequence_columns.get(anno)
+            self.columns[anno] = (gene, keys.index(csq) if csq in keys else None)
+
+    def __call__(self, variant):
+        return self.gene(variant.INFO)
+
+    def gene(self, info):
+        """the gene for the INFO of a variant (or a dict)."""
+        values = tuple(info.get(anno) for anno in self.annos)
+        try:
+            return self.cache[values]
+        except KeyError:
+            pass
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        gene = self.cache[values] = self._find(values)
+        return gene
+
+    def _find(self, values):
+        for anno, value in zip(self.annos, values):
+            if value is None:
+                continue
+            gene = self._gene(anno, value.split(","))
+            if gene:
+                return gene
+
+    def _gene(self, anno, consequences):
+        gcol, ccol = self.columns[anno]
+        if gcol is None or (ccol is None and self.severity is not None):
+            return self._slow(anno, consequences)
+        split = _split_eff if anno == "EFF" else lambda c: c.split("|")
+        need = max(gcol, -1 if ccol is None else ccol)
+        genes = set()
+        for c in consequences:
+            fields = split(c)
+            if need >= len(fields):
+                return self._slow(anno, consequences)
+            if self.severity is not None and self._impact(anno, fields[ccol].strip(), c) not in self.severity:
+                continue
+            gene = fields[gcol].strip()
+            if gene:
+                genes.add(gene)
+        if len(genes) > 1:
+            # the order of effects decides between genes.
+            return self._slow(anno, consequences)
+        return next(iter(genes), None)
+
+    def _impact(self, anno, consequence, effect):
+        # the impact depends only on the consequence column.
+        key = (anno, consequence)
+        try:
+            return self.impacts[key]
+        except KeyError:
+            imp = self.impacts[key] = Effect.new(anno, effect, self.annos[anno]).impact_severity
+            return imp
+
+    def _slow(self, anno, consequences):
+        effs = (Effect.new(anno, c, self.annos[anno]) for c in consequences)
+        # limit to requested severity
+        if self.severity is not None:
+            effs = [e for e in effs if e.impact_severity in self.severity]
+        effs = sorted(effs, reverse=True)
+        for eff in effs:
+            if eff.gene:
+                return eff.gene
@@ -0,0 +1,10 @@
+"""
+Benchmarks of the inheritance models on simulated cohorts.
+
+ + simulate: pedigrees and VCFs with Mendelian transmission, de novo
+   mutations, errors and depth/GQ.
+ + harness: variants/sec and peak RSS per model, family shape and cohort size.
+ + baseline.json: stored results to compare against.
+
+Run as `python -m inheritance.bench`; see --help.
+"""
@@ -0,0 +1,61 @@
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import sys
+
+from . import harness
+
+baseline = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def main(args=None):
+    p = argparse.ArgumentParser(description="benchmark the inheritance models on simulated cohorts")
+    p.add_argument("--kinds", default="eval,cli", help="eval and/or cli (see inheritance.bench.harness)")
+    p.add_argument("--models", default="auto_rec,auto_dom,de_novo,comp_het")
+    p.add_argument("--shapes", default="trio,3gen", help="any of %s" % ",".join(sorted(harness.shapes)))
+    p.add_argument("--families", default="10,100,1000", help="cohort sizes for eval cases")
+    p.add_argument("--cli-families", default="10,100", help="cohort sizes for cli cases")
+    p.add_argument("--variants", type=int, default=2000)
+    p.add_argument("--save", help="write the results as JSON to this file")
+    p.add_argument("--baseline", default=baseline,
+                   help="compare to the results in this file (default: the stored baseline)")
+    p.add_argument("--tolerance", type=float, default=0.25,
+                   help="report cases slower than the baseline by more than this fraction")
+    a = p.parse_args(args)
+
+    def ints(s):
+        return [int(x) for x in s.split(",") if x]
+
+    kinds, models, shapes = a.kinds.split(","), a.models.split(","), a.shapes.split(",")
+    todo = []
+    for kind in kinds:
+        families = ints(a.families if kind == "eval" else a.cli_families)
+        todo.extend(harness.cases([kind], models, shapes, families, a.variants))
+
+    print("%-36s %8s %8s %12s %10s" % ("case", "samples", "hits", "variants/s", "peak MB"))
+    results = []
+    for r in harness.measure(todo):
+        print("%-36s %8d %8d %12.1f %10.1f" % (harness.key(r), r["samples"], r["hits"],
+                                               r["variants_per_sec"], r["peak_rss_mb"]))
+        sys.stdout.flush()
+        results.append(r)
+
+    if a.save:
+        harness.save(a.save, results)
+
+    if a.baseline and os.path.exists(a.baseline):
+        with open(a.baseline) as fh:
+            base = json.load(fh)
+        lines, regressions = harness.compare(results, base, a.tolerance)
+        if lines:
+            print("\n%-36s %10s %10s %7s %8s %8s" % ("variants/s and MB vs baseline", "baseline", "now", "",
+                                                    "baseline", "now"))
+            print("\n".join(lines))
+        if regressions:
+            sys.exit("%d case(s) slower or using more memory than the baseline" % regressions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Time the models on simulated cohorts and report variants/sec and peak
+memory for each model, family shape and cohort size.
+
+There are 2 kinds of case:
+
+ + eval: CohortEvaluator called on 1 variant at a time as in the CLI, on
+   genotypes simulated in memory. This follows changes to the models
+   (inheritance.py) and their evaluation.
+ + cli: the CLI `run` on a simulated VCF, including reading, annotation,
+   grouping and writing (__main__.py).
+
+Each case runs in a new process so that its peak RSS is its own.
+"""
+from __future__ import print_function
+
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from . import simulate
+
+# (generations, kids per couple)
+shapes = {"trio": (2, 1), "quartet": (2, 2), "3gen": (3, 2)}
+
+
+def key(case):
+    return "%(kind)s/%(model)s/%(shape)s/%(families)d/%(variants)d" % case
+
+
+def cases(kinds, models, shape_names, families, variants):
+    for kind in kinds:
+        for model in models:
+            for shape in shape_names:
+                for n in families:
+                    yield dict(kind=kind, model=model, shape=shape, families=n, variants=variants)
+
+
+def _peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on mac, kilobytes on linux.
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+
+def _eval(case, rows, chunk=500):
+    from ..pyeval import Family
+    from ..npeval import CohortEvaluator
+
+    rng = np.random.default_rng(42)
+    order = dict((r[1], i) for i, r in enumerate(rows))
+    fams = Family.from_ped("\n".join("\t".join(r) for r in rows), order=order)
+    cohort = CohortEvaluator(fams, case["model"], min_depth=5, min_gq=5)
+
+    elapsed, hits = 0, 0
+    # simulate in chunks so the genotypes don't dominate memory use.
+    for start in range(0, case["variants"], chunk):
+        gts = simulate.genotypes(rows, min(chunk, case["variants"] - start), rng)
+        depths, _, quals = simulate.depths_quals(gts, rng)
+        t0 = time.time()
+        for g, d, q in zip(gts, depths, quals):
+            hits += cohort(g, gt_depths=d, gt_quals=q).sum()
+        elapsed += time.time() - t0
+    return elapsed, int(hits)
+
+
+def _cli(case, rows):
+    from ..__main__ import run
+
+    tmp = tempfile.mkdtemp()
+    ped, vcf = os.path.join(tmp, "bench.ped"), os.path.join(tmp, "bench.vcf")
+    try:
+        with open(ped, "w") as fh:
+            simulate.write_ped(fh, rows)
+        with open(vcf, "w") as fh:
+            simulate.write_vcf(fh, rows, case["variants"])
+        out = os.path.join(tmp, "out.vcf")
+        t0 = time.time()
+        run(case["model"], ped, vcf, 5, 5, 0, None, output=out)
+        elapsed = time.time() - t0
+        with open(out) as fh:
+            hits = sum(1 for l in fh if not l.startswith("#"))
+        return elapsed, hits
+    finally:
+        for f in os.listdir(tmp):
+            os.unlink(os.path.join(tmp, f))
+        os.rmdir(tmp)
+
+
+def run_case(case):
+    """run 1 case and return its result. Call in a new process for the RSS."""
+    # the models warn about e.g. affecteds with affected parents.
+    sys.stderr = open(os.devnull, "w")
+    generations, children = shapes[case["shape"]]
+    rows = simulate.cohort(case["families"], generations, children)
+    elapsed, hits = (_eval if case["kind"] == "eval" else _cli)(case, rows)
+    return dict(case, samples=len(rows), hits=hits, seconds=round(elapsed, 4),
+                variants_per_sec=round(case["variants"] / max(elapsed, 1e-9), 1),
+                peak_rss_mb=round(_peak_rss_mb(), 1))
+
+
+def measure(cases):
+    """yield the result of each case, each run in a new process."""
+    import multiprocessing as mp
+    ctx = mp.get_context("spawn") if hasattr(mp, "get_context") else mp
+    for case in cases:
+        pool = ctx.Pool(1)
+        try:
+            yield pool.apply(run_case, (case,))
+        finally:
+            pool.close()
+            pool.join()
+
+
+def environment():
+    return dict(python=platform.python_version(), numpy=np.__version__,
+                machine=platform.machine(), processor=platform.processor() or None)
+
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    return (lines, regressions) comparing the variants/sec and peak RSS of
+    `results` with those of the same cases in `baseline` (as saved by the
+    harness). A case is a regression if it is slower or uses more memory by
+    more than `tolerance`.
+    """
+    base = baseline["results"]
+    lines, regressions = [], 0
+    for r in results:
+        b = base.get(key(r))
+        if b is None:
+            continue
+        speed = r["variants_per_sec"] / b["variants_per_sec"]
+        memory = r["peak_rss_mb"] / b["peak_rss_mb"]
+        flags = []
+        if speed < 1 - tolerance:
+            flags.append("SLOWER")
+        if memory > 1 + tolerance:
+            flags.append("MORE MEMORY")
+        regressions += bool(flags)
+        lines.append(("%-36s %10.1f %10.1f %6.2fx %8.1f %8.1f  %s" % (
+            key(r), b["variants_per_sec"], r["variants_per_sec"], speed,
+            b["peak_rss_mb"], r["peak_rss_mb"], " ".join(flags))).rstrip())
+    return lines, regressions
+
+
+def save(path, results):
+    with open(path, "w") as fh:
+        json.dump(dict(environment=environment(),
+                       results=dict((key(r), r) for r in results)),
+                  fh, indent=1, sort_keys=True)
+        fh.write("\n")
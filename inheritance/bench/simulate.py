@@ -0,0 +1,214 @@
+"""
+Simulate a cohort of families: multi-generation pedigrees and genotypes
+transmitted from parents to kids following Mendel's laws with de novo
+mutations, genotyping errors, missing calls and depth and GQ that vary by
+sample and variant. Used by the benchmarks; it can also write a PED and VCF
+to try the CLI:
+
+    python -m inheritance.bench.simulate --families 100 --generations 3 out.ped out.vcf
+
+>>> rows = pedigree('f1', generations=3, children=2, rng=random.Random(1))
+>>> len(rows), sum(r[2] == '0' for r in rows)
+(10, 4)
+>>> gts = genotypes(rows, 5, np.random.default_rng(1), error_rate=0, missing_rate=0)
+>>> gts.shape
+(5, 10)
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import sys
+
+import numpy as np
+
+ANN = ("Functional annotations: 'Allele | Annotation | Annotation_Impact | Gene_Name | Gene_ID | "
+       "Feature_Type | Feature_ID | Transcript_BioType | Rank | HGVS.c | HGVS.p | "
+       "cDNA.pos / cDNA.length | CDS.pos / CDS.length | AA.pos / AA.length | Distance | "
+       "ERRORS / WARNINGS / INFO' ")
+
+effects = (("missense_variant", "MODERATE"), ("stop_gained", "HIGH"),
+           ("synonymous_variant", "LOW"), ("intron_variant", "MODIFIER"))
+
+# gt_types for 0, 1 and 2 alt alleles.
+_codes = np.array([0, 1, 3], dtype=np.int8)
+_gts = ["0/0", "0/1", "./.", "1/1"]
+
+
+def pedigree(family_id, generations=2, children=1, affected=0.5, rng=random):
+    """
+    rows of (family_id, sample_id, paternal_id, maternal_id, sex, phenotype)
+    for a family that starts with 2 founders. Each couple has `children`
+    kids and, except in the last generation, each kid has kids with a new
+    founder. Parents always come before their kids.
+
+    With probability `affected` the family has a dominant phenotype: 1
+    founder is affected and each kid of an affected parent is affected
+    with probability 1/2, as if it got the parent's disease allele.
+    Otherwise kids in the last generation are affected with probability
+    `affected`; at least 1 is.
+    """
+    rows = []
+    dominant = rng.random() < affected
+    sick = set()
+
+    def person(dad, mom, sex, phenotype):
+        sample_id = "%s_%d" % (family_id, len(rows))
+        rows.append([family_id, sample_id, dad, mom, sex, phenotype])
+        if phenotype == "2":
+            sick.add(sample_id)
+        return sample_id
+
+    founder = rng.choice("12") if dominant else None
+    couples = [(person("0", "0", "1", "2" if founder == "1" else "1"),
+                person("0", "0", "2", "2" if founder == "2" else "1"))]
+    for generation in range(1, generations):
+        last = generation == generations - 1
+        nxt = []
+        for dad, mom in couples:
+            for _ in range(children):
+                sex = rng.choice("12")
+                if dominant:
+                    is_affected = (dad in sick or mom in sick) and rng.random() < 0.5
+                else:
+                    is_affected = last and rng.random() < affected
+                kid = person(dad, mom, sex, "2" if is_affected else "1")
+                if not last:
+                    spouse = person("0", "0", "2" if sex == "1" else "1", "1")
+                    nxt.append((kid, spouse) if sex == "1" else (spouse, kid))
+        couples = nxt
+    if not any(r[5] == "2" for r in rows):
+        rows[-1][5] = "2"
+    return [tuple(r) for r in rows]
+
+
+def cohort(n_families, generations=2, children=1, affected=0.5, seed=42):
+    """the pedigree rows for `n_families` families."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_families):
+        rows.extend(pedigree("f%d" % i, generations, children, affected, rng))
+    return rows
+
+
+def write_ped(fh, rows):
+    for row in rows:
+        fh.write("\t".join(row) + "\n")
+
+
+def allele_frequencies(n_variants, rng):
+    """mostly rare allele frequencies as for exome variants."""
+    return np.maximum(rng.beta(0.2, 8, size=n_variants), 1e-4)
+
+
+def genotypes(rows, n_variants, rng, af=None, de_novo_rate=1e-3, error_rate=1e-3,
+              missing_rate=0.01):
+    """
+    a variants x samples array of gt_types (0: HOM_REF, 1: HET, 2: UNKNOWN,
+    3: HOM_ALT) for the samples in `rows`. Founders draw their alleles from
+    `af`; kids get 1 allele from each parent (so parents must come first),
+    then an allele becomes alt with probability `de_novo_rate`. Calls are
+    replaced with a random genotype with probability `error_rate` and are
+    missing with probability `missing_rate`.
+    """
+    if af is None:
+        af = allele_frequencies(n_variants, rng)
+    index = dict((r[1], i) for i, r in enumerate(rows))
+    alleles = np.zeros((len(rows), 2, n_variants), dtype=np.int8)
+    variants = np.arange(n_variants)
+    for i, (_, _, dad, mom, _, _) in enumerate(rows):
+        if dad == "0" or mom == "0":
+            alleles[i] = rng.random((2, n_variants)) < af
+            continue
+        for j, parent in enumerate((index[dad], index[mom])):
+            alleles[i, j] = alleles[parent, rng.integers(0, 2, n_variants), variants]
+        alleles[i, 0] |= rng.random(n_variants) < de_novo_rate
+    gts = _codes[alleles.sum(axis=1)].T
+    errors = rng.random(gts.shape) < error_rate
+    gts[errors] = rng.choice(_codes, errors.sum())
+    gts[rng.random(gts.shape) < missing_rate] = 2
+    return gts
+
+
+def depths_quals(gts, rng, mean_depth=30):
+    """
+    over-dispersed depths around `mean_depth` (varying by sample), the alt
+    depths for the genotypes and GQs that grow with depth. Missing calls
+    have depths and GQ of -1.
+    """
+    sample_depth = rng.gamma(8, mean_depth / 8.0, size=gts.shape[1])
+    depths = rng.poisson(rng.gamma(4, sample_depth / 4.0, size=gts.shape))
+    # a little of the other allele for homozygotes.
+    alt_fraction = np.array([0.01, 0.5, 0, 0.99])[gts]
+    alts = rng.binomial(depths, alt_fraction)
+    quals = np.minimum(99, rng.gamma(2, 1.5 * depths + 1)).astype(np.int64)
+    missing = gts == 2
+    depths[missing] = alts[missing] = quals[missing] = -1
+    return depths, alts, quals
+
+
+def write_vcf(fh, rows, n_variants, seed=42, chunk=1000, variants_per_gene=20, **kwargs):
+    """
+    write a VCF for the samples in `rows` with GT, DP, GQ and AD and an ANN
+    annotation. Each run of `variants_per_gene` variants is in the same gene.
+    `kwargs` go to `genotypes`.
+    """
+    rng = np.random.default_rng(seed)
+    fh.write("##fileformat=VCFv4.1\n")
+    fh.write("##contig=<ID=1,length=%d>\n" % (200 * n_variants + 1000))
+    fh.write('##INFO=<ID=AF,Number=A,Type=Float,Description="population allele frequency">\n')
+    fh.write('##INFO=<ID=ANN,Number=.,Type=String,Description="%s">\n' % ANN)
+    fh.write('##FILTER=<ID=LowQual,Description="low quality">\n')
+    fh.write('##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">\n')
+    fh.write('##FORMAT=<ID=DP,Number=1,Type=Integer,Description="Depth">\n')
+    fh.write('##FORMAT=<ID=GQ,Number=1,Type=Integer,Description="Genotype quality">\n')
+    fh.write('##FORMAT=<ID=AD,Number=R,Type=Integer,Description="Allele depths">\n')
+    fh.write("#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\t")
+    fh.write("\t".join(r[1] for r in rows) + "\n")
+
+    pos = 1000
+    for start in range(0, n_variants, chunk):
+        n = min(chunk, n_variants - start)
+        af = allele_frequencies(n, rng)
+        gts = genotypes(rows, n, rng, af=af, **kwargs)
+        depths, alts, quals = depths_quals(gts, rng)
+        for i in range(n):
+            k = start + i
+            pos += int(rng.integers(1, 200))
+            effect, impact = effects[k % len(effects)]
+            gene = "G%d" % (k // variants_per_gene)
+            info = "AF=%.4g;ANN=G|%s|%s|%s|%s|transcript|T%s|protein_coding|1/2|c.1A>G|p.X|1/2|1/2|1/2||" % (
+                af[i], effect, impact, gene, gene, gene)
+            calls = ["%s:%d:%d:%d,%d" % (_gts[g], d, q, d - a, a) if d >= 0 else "./.:.:.:.,."
+                     for g, d, a, q in zip(gts[i].tolist(), depths[i].tolist(), alts[i].tolist(),
+                                           quals[i].tolist())]
+            fh.write("1\t%d\t.\tA\tG\t50\t%s\t%s\tGT:DP:GQ:AD\t%s\n" % (
+                pos, "PASS" if k % 10 else "LowQual", info, "\t".join(calls)))
+
+
+def main(args=None):
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--families", type=int, default=100)
+    p.add_argument("--generations", type=int, default=2, help="2 for parents and kids")
+    p.add_argument("--children", type=int, default=1, help="kids per couple")
+    p.add_argument("--variants", type=int, default=10000)
+    p.add_argument("--de-novo-rate", type=float, default=1e-3)
+    p.add_argument("--error-rate", type=float, default=1e-3)
+    p.add_argument("--missing-rate", type=float, default=0.01)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("ped")
+    p.add_argument("vcf")
+    a = p.parse_args(args)
+
+    rows = cohort(a.families, a.generations, a.children, seed=a.seed)
+    with open(a.ped, "w") as fh:
+        write_ped(fh, rows)
+    with open(a.vcf, "w") as fh:
+        write_vcf(fh, rows, a.variants, seed=a.seed, de_novo_rate=a.de_novo_rate,
+                  error_rate=a.error_rate, missing_rate=a.missing_rate)
+    print("wrote %d samples in %d families and %d variants" % (len(rows), a.families, a.variants),
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Genotypes packed at 2 bits per sample and models evaluated with bitwise
+operations on 64 variants at a time.
+
+gt_types are 0..3 (HOM_REF, HET, UNKNOWN, HOM_ALT) so each sample is stored
+as 2 bit-planes over variants: `lo` holds bit 0 of the genotype and `hi`
+holds bit 1. A test like gt_types[kid] == HET is then ~hi & lo on whole
+uint64 words. Other fields (gt_depths, gt_quals, ...) are compared as usual
+and packed to words.
+
+>>> import numpy as np
+>>> gts = np.array([[1, 1, 3],
+...                 [1, 1, 1],
+...                 [0, 1, 3]])
+>>> packed = PackedGenotypes.pack(gts)
+>>> packed.n_variants, packed.n_samples, packed.nbytes
+(3, 3, 48)
+>>> bool((packed.unpack() == gts).all())
+True
+
+>>> from inheritance import Sample, Family
+>>> mom, dad, kid = Sample('mom', False), Sample('dad', False), Sample('kid', True)
+>>> kid.mom, kid.dad = mom, dad
+>>> mom._i, dad._i, kid._i = 0, 1, 2
+>>> ev = BitsetEvaluator([Family([mom, dad, kid], 'trio')], 'auto_rec')
+>>> ev(packed)
+array([[ True, False, False]])
+"""
+import numpy as np
+
+from . import pyeval
+from .expr import And, Or, Not, Cmp, Ref, as_node, simplify, _ops
+
+_word = np.dtype('<u8')
+
+
+def pack_bits(mask):
+    """
+    pack a boolean array of (..., variants) into uint64 words of (...,
+    ceil(variants / 64)) where bit i of word w is variant 64 * w + i.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    n_words = (mask.shape[-1] + 63) // 64
+    b = np.packbits(mask, axis=-1, bitorder='little')
+    pad = [(0, 0)] * (b.ndim - 1) + [(0, 8 * n_words - b.shape[-1])]
+    return np.ascontiguousarray(np.pad(b, pad)).view(_word)
+
+
+def unpack_bits(words, n):
+    """the boolean array for the first `n` variants in packed `words`."""
+    b = np.ascontiguousarray(words, dtype=_word).view(np.uint8)
+    return np.unpackbits(b, axis=-1, count=n, bitorder='little').astype(bool)
+
+
+class PackedGenotypes(object):
+    """
+    gt_types for samples x variants stored as 2 uint64 bit-planes per sample.
+    `lo` and `hi` have shape (samples, words).
+    """
+
+    __slots__ = ('lo', 'hi', 'n_variants')
+
+    def __init__(self, lo, hi, n_variants):
+        self.lo, self.hi, self.n_variants = lo, hi, n_variants
+
+    @classmethod
+    def pack(klass, gt_types):
+        """pack a variants x samples array of gt_types (as from cyvcf2)."""
+        gt_types = np.asarray(gt_types)
+        assert gt_types.ndim == 2, gt_types.shape
+        t = gt_types.T
+        return klass(pack_bits(t & 1), pack_bits(t & 2), gt_types.shape[0])
+
+    @classmethod
+    def concatenate(klass, blocks):
+        """
+        join packed blocks (e.g. as read along a chromosome) in order. Blocks
+        of a multiple of 64 variants are joined without unpacking. There must
+        be at least 1 block as the number of samples comes from the blocks.
+        """
+        blocks = list(blocks)
+        assert blocks, "need at least 1 block to concatenate"
+        n = sum(b.n_variants for b in blocks)
+        if all(b.n_variants % 64 == 0 for b in blocks[:-1]):
+            return klass(np.hstack([b.lo for b in blocks]),
+                         np.hstack([b.hi for b in blocks]), n)
+        planes = [pack_bits(np.hstack([unpack_bits(getattr(b, p), b.n_variants) for b in blocks]))
+                  for p in ('lo', 'hi')]
+        return klass(planes[0], planes[1], n)
+
+    @property
+    def n_samples(self):
+        return self.lo.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.lo.nbytes + self.hi.nbytes
+
+    def unpack(self):
+        """the variants x samples array of gt_types."""
+        n = self.n_variants
+        return (unpack_bits(self.lo, n).astype(np.int8) |
+                (unpack_bits(self.hi, n).astype(np.int8) << 1)).T
+
+
+def _column(s):
+    # integer sample_ids are 1-based; this indexes the planes by Sample._i.
+    return s._i + 1
+
+
+class BitsetEvaluator(object):
+    """
+    Evaluate a model for each of `families` on PackedGenotypes holding all
+    samples (in the order used for Sample._i). Calling returns a families x
+    variants boolean matrix; `words` returns the same as packed uint64 words.
+    """
+
+    def __init__(self, families, model, *args, **kwargs):
+        if isinstance(families, dict):
+            families = list(families.values())
+        self.family_ids = [f.family_id for f in families]
+        self.model = model
+        self.nodes = []
+        for f in families:
+            if not f.plan(model, *args, **kwargs).feasible:
+                self.nodes.append(False)
+                continue
+            flt = getattr(pyeval.Family.from_family(f, sample_id=_column), model)(*args, **kwargs)
+            self.nodes.append(simplify(as_node(pyeval.simplified(flt))))
+
+    def __len__(self):
+        return len(self.family_ids)
+
+    def words(self, packed, **arrays):
+        """
+        the packed result for each family. `arrays` holds the variants x
+        samples arrays for the other fields the model uses (e.g. gt_depths).
+        """
+        n_words = packed.lo.shape[1]
+        ones = np.full(n_words, ~np.uint64(0), dtype=_word)
+        # clear the bits past the last variant so ~ doesn't set them.
+        valid = pack_bits(np.ones(packed.n_variants, dtype=bool))
+        out = np.zeros((len(self), n_words), dtype=_word)
+        cache = {}
+        for k, node in enumerate(self.nodes):
+            if node is False:
+                continue
+            out[k] = (ones if node is True else self._eval(node, packed, arrays, cache)) & valid
+        return out
+
+    def __call__(self, packed, **arrays):
+        return unpack_bits(self.words(packed, **arrays), packed.n_variants)
+
+    def _eval(self, node, packed, arrays, cache):
+        try:
+            return cache[node]
+        except KeyError:
+            pass
+        if isinstance(node, (And, Or)):
+            vals = [self._eval(a, packed, arrays, cache) for a in node.args]
+            res = vals[0]
+            for v in vals[1:]:
+                res = (res & v) if isinstance(node, And) else (res | v)
+        elif isinstance(node, Not):
+            res = ~self._eval(node.args[0], packed, arrays, cache)
+        elif isinstance(node, Cmp) and node.field == 'gt_types':
+            res = self._genotype(node, packed)
+        elif isinstance(node, Cmp):
+            value = node.value
+            if isinstance(value, Ref):
+                value = np.asarray(arrays[value.field])[:, value.sample]
+            col = np.asarray(arrays[node.field])[:, node.sample]
+            res = pack_bits(_ops[node.op](col, value))
+        else:
+            raise ValueError("can't evaluate %r on packed genotypes" % (node,))
+        cache[node] = res
+        return res
+
+    def _genotype(self, node, packed):
+        lo, hi = packed.lo[node.sample], packed.hi[node.sample]
+        value = node.value
+        if isinstance(value, Ref):
+            assert value.field == 'gt_types', node
+            same = ~(lo ^ packed.lo[value.sample]) & ~(hi ^ packed.hi[value.sample])
+        else:
+            same = (lo if value & 1 else ~lo) & (hi if value & 2 else ~hi)
+        if node.op == '==':
+            return same
+        if node.op == '!=':
+            return ~same
+        raise ValueError("only == and != are supported for packed genotypes: %r" % (node,))
@@ -0,0 +1,154 @@
+"""
+Compile an inheritance model for a single family into a plain python function.
+
+The filter from the pyeval implementation is parsed with `ast` and written
+back out as straight-line code where sample indices are constants, the
+genotype of each sample that is used is read once into a local, and the
+operands of each and/or are ordered so that genotype checks run before the
+depth, quality and likelihood checks. The source of the function is kept so
+it can be exported to an importable module.
+
+>>> from inheritance import Sample, Family
+>>> mom, dad, kid = Sample('mom', False), Sample('dad', False), Sample('kid', True)
+>>> kid.mom, kid.dad = mom, dad
+>>> f = compile_model(Family([mom, dad, kid], 'trio'), 'auto_rec', dict(min_depth=10))
+>>> print(f.source.strip())
+def auto_rec_trio(gt_types, gt_depths=None, gt_quals=None, gt_phred_ll_homref=None, gt_phred_ll_het=None, gt_phred_ll_homalt=None):
+    g0 = gt_types[0]
+    g1 = gt_types[1]
+    g2 = gt_types[2]
+    return (g2 == 3 and g0 == 1 and g1 == 1 and g0 != 3 and g1 != 3 and gt_depths[2] >= 10 and gt_depths[0] >= 10 and gt_depths[1] >= 10)
+>>> f([1, 1, 3], [20, 20, 20])
+True
+>>> f([1, 1, 3], [20, 2, 20])
+False
+"""
+from __future__ import print_function
+
+import ast
+import re
+
+from . import pyeval
+
+arguments = ('gt_types', 'gt_depths', 'gt_quals', 'gt_phred_ll_homref',
+             'gt_phred_ll_het', 'gt_phred_ll_homalt')
+
+_cmp_ops = {ast.Eq: '==', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=',
+            ast.Gt: '>', ast.GtE: '>='}
+
+# python 3.9 dropped the ast.Index wrapper around subscripts.
+_Index = getattr(ast, 'Index', ())
+
+
+def _const(node):
+    if isinstance(node, ast.Name):
+        return {'True': True, 'False': False, 'None': None}[node.id]
+    for attr in ('value', 'n'):
+        if hasattr(node, attr):
+            return getattr(node, attr)
+    raise ValueError("unsupported node: %s" % ast.dump(node))
+
+
+class _Emitter(object):
+
+    def __init__(self):
+        # indices of samples whose genotype is read into a local.
+        self.genotypes = set()
+
+    def cost(self, node):
+        """
+        order operands by the most expensive field they use and then by
+        their size so that cheap genotype checks can short-circuit the rest.
+        """
+        if isinstance(node, ast.BoolOp):
+            costs = [self.cost(v) for v in node.values]
+            return (max(c[0] for c in costs), sum(c[1] for c in costs))
+        if isinstance(node, ast.UnaryOp):
+            return self.cost(node.operand)
+        if isinstance(node, ast.Compare):
+            fields = [n.value.id for n in ast.walk(node) if isinstance(n, ast.Subscript)]
+            return (0 if all(f == 'gt_types' for f in fields) else 1, 1)
+        return (0, 0)
+
+    def operands(self, node):
+        for v in node.values:
+            if isinstance(v, ast.BoolOp) and isinstance(v.op, type(node.op)):
+                for o in self.operands(v):
+                    yield o
+            else:
+                yield v
+
+    def emit(self, node):
+        if isinstance(node, ast.BoolOp):
+            values = sorted(self.operands(node), key=self.cost)
+            joiner = " and " if isinstance(node.op, ast.And) else " or "
+            return "(%s)" % joiner.join(self.emit(v) for v in values)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return "(not %s)" % self.emit(node.operand)
+        if isinstance(node, ast.Compare):
+            assert len(node.ops) == 1, ast.dump(node)
+            # comparisons bind tighter than and/or/not so need no brackets.
+            return "%s %s %s" % (self.emit(node.left), _cmp_ops[type(node.ops[0])],
+                                 self.emit(node.comparators[0]))
+        if isinstance(node, ast.Subscript):
+            sl = node.slice
+            if isinstance(sl, _Index):
+                sl = sl.value
+            field, i = node.value.id, _const(sl)
+            if field == 'gt_types':
+                self.genotypes.add(i)
+                return "g%d" % i
+            return "%s[%d]" % (field, i)
+        return repr(_const(node))
+
+
+def _identifier(s):
+    s = re.sub(r"\W", "_", str(s))
+    return s if not s[0].isdigit() else "_" + s
+
+
+def model_source(family, model, kwargs=None, columns=False, name=None):
+    """
+    return the source of a function that evaluates `model` with `kwargs` for
+    `family`. If `columns` is True, samples are indexed by their position in
+    the full arrays (Sample._i) rather than by their position in the family.
+    """
+    if columns:
+        key = lambda s: s._i + 1
+    else:
+        order = dict((id(s), i) for i, s in enumerate(family.subjects))
+        key = lambda s: order[id(s)] + 1
+    flt = pyeval.simplified(getattr(pyeval.Family.from_family(family, sample_id=key), model)(**(kwargs or {})))
+    name = name or _identifier("%s_%s" % (model, family.family_id))
+
+    e = _Emitter()
+    body = e.emit(ast.parse(str(flt), mode="eval").body)
+    lines = ["def %s(%s):" % (name, ", ".join([arguments[0]] + ["%s=None" % a for a in arguments[1:]]))]
+    lines.extend("    g%d = gt_types[%d]" % (i, i) for i in sorted(e.genotypes))
+    lines.append("    return %s" % body)
+    return "\n".join(lines) + "\n"
+
+
+def compile_model(family, model, kwargs=None, columns=False, name=None):
+    """
+    return a function that evaluates `model` for `family`. It takes the
+    gt_types, gt_depths, gt_quals, ... arrays for a single variant and its
+    source is available as the `source` attribute.
+    """
+    source = model_source(family, model, kwargs, columns=columns, name=name)
+    ns = {}
+    exec(compile(source, "<%s:%s>" % (family.family_id, model), "exec"), ns)
+    fn = next(v for k, v in ns.items() if k != '__builtins__')
+    fn.source = source
+    return fn
+
+
+def export(fh, functions):
+    """
+    write the source of the compiled `functions` to `fh` as a module that can
+    be imported without this package.
+    """
+    fh.write("# generated by inheritance.codegen\n")
+    for fn in functions:
+        fh.write("\n\n")
+        fh.write(fn.source)
@@ -7,6 +7,9 @@ import atexit
 
 import itertools as it
 
+from .inheritance import pedigree_generation
+from .pyeval import simplified
+
 try:
     basestring
     ints = (int, long)
@@ -24,6 +27,73 @@ def tmp(pedstr, suf=".ped"):
     return t
 
 
+gt_fields = ('gt_types', 'gt_quals', 'gt_depths', 'gt_phred_ll_homref',
+             'gt_phred_ll_het', 'gt_phred_ll_homalt')
+
+
+class Prepared(object):
+    """
+    A model (e.g. 'auto_rec') with fixed arguments for a single EvalFamily.
+    The filter is generated and compiled once and then re-used for every call
+    until the pedigree changes (a phenotype, sex, parent or sample id).
+
+    >>> from inheritance import Sample, Family
+    >>> mom, dad, kid = Sample('mom', False), Sample('dad', False), Sample('kid', True)
+    >>> kid.mom, kid.dad = mom, dad
+    >>> efam = EvalFamily(Family([mom, dad, kid], 'trio'))
+    >>> auto_rec = efam.prepare('auto_rec', min_depth=10)
+    >>> efam.gt_types, efam.gt_depths = [1, 1, 3], [20, 20, 20]
+    >>> auto_rec()
+    True
+    >>> auto_rec(gt_types=[1, 1, 1])
+    False
+    >>> mom.affected = True
+    >>> auto_rec()
+    False
+    """
+
+    __slots__ = ('efam', 'model', 'args', 'kwargs', 'filter', 'code', 'env',
+                 '_key', '_generation')
+
+    def __init__(self, efam, model, args=(), kwargs=None):
+        self.efam = efam
+        self.model = model
+        self.args = args
+        self.kwargs = kwargs or {}
+        self._key = None
+        self._compile()
+
+    def _compile(self):
+        family = self.efam.family
+        self._generation = pedigree_generation()
+        key = family.pedigree_key()
+        if key == self._key:
+            return
+        self._key = key
+        self.env = {s.sample_id: i for i, s in enumerate(family.subjects)}
+        self._use(simplified(family.plan(self.model, *self.args, **self.kwargs).filter))
+
+    def _use(self, flt):
+        self.filter = flt
+        try:
+            self.code = compile(flt, "<%s:%s>" % (self.efam.family.family_id, self.model), "eval")
+        except SyntaxError:
+            print("attempted compile:", flt, file=sys.stderr)
+            raise
+
+    def _update(self, arrays):
+        if self._generation != pedigree_generation():
+            self._compile()
+        env, efam = self.env, self.efam
+        for k in gt_fields:
+            env[k] = arrays[k] if k in arrays else getattr(efam, k)
+        return env
+
+    def __call__(self, **arrays):
+        env = self._update(arrays)
+        return eval(self.code, env)
+
+
 class EvalFamily(object):
 
     __slots__ = ('ped', 'family', '_gt_types',
@@ -31,7 +101,9 @@ class EvalFamily(object):
                  '_gt_phred_ll_het',
                  '_gt_phred_ll_homalt',
                  '_gt_quals',
-                 '_gt_depths', 'strict', 'subjects')
+                 '_gt_depths', 'strict', 'subjects', '_prepared')
+
+    prepared_class = Prepared
 
     def __init__(self, family, fam_id=None, gt_types=None, gt_depths=None):
         # can send in a family.
@@ -50,6 +122,24 @@ class EvalFamily(object):
         self.gt_depths = gt_depths
         self._gt_phred_ll_homalt = self._gt_phred_ll_homref = self._gt_phred_ll_het = None
         self._gt_quals = None
+        self._prepared = {}
+
+    def _check(self, arr):
+        assert len(arr) == len(self.family)
+        return arr
+
+    def prepare(self, model, *args, **kwargs):
+        """
+        return a callable that evaluates `model` (e.g. 'auto_rec') with the
+        given arguments against the current (or explicitly sent) genotype
+        arrays. Prepared models are cached by their arguments.
+        """
+        key = (model, args, tuple(sorted(kwargs.items())))
+        try:
+            return self._prepared[key]
+        except KeyError:
+            p = self._prepared[key] = self.prepared_class(self, model, args, kwargs)
+            return p
 
     def draw(self, tests=('auto_rec', 'auto_dom')):
         from IPython.display import Image, display
@@ -103,8 +193,7 @@ class EvalFamily(object):
     @gt_types.setter
     def gt_types(self, gt_types):
         if gt_types is not None:
-            assert len(gt_types) == len(self.family)
-            self._gt_types = gt_types
+            self._gt_types = self._check(gt_types)
 
     @property
     def gt_quals(self):
@@ -113,8 +202,7 @@ class EvalFamily(object):
     @gt_quals.setter
     def gt_quals(self, gt_quals):
         if gt_quals is not None:
-            assert len(gt_quals) == len(self.family)
-            self._gt_quals = gt_quals
+            self._gt_quals = self._check(gt_quals)
 
     @property
     def gt_depths(self):
@@ -123,8 +211,7 @@ class EvalFamily(object):
     @gt_depths.setter
     def gt_depths(self, gt_depths):
         if gt_depths is not None:
-            assert len(gt_depths) == len(self.family)
-            self._gt_depths = gt_depths
+            self._gt_depths = self._check(gt_depths)
 
     @property
     def gt_phred_ll_homref(self):
@@ -133,8 +220,7 @@ class EvalFamily(object):
     @gt_phred_ll_homref.setter
     def gt_phred_ll_homref(self, gt_phred_ll_homref):
         if gt_phred_ll_homref is not None:
-            assert len(gt_phred_ll_homref) == len(self.family)
-            self._gt_phred_ll_homref = gt_phred_ll_homref
+            self._gt_phred_ll_homref = self._check(gt_phred_ll_homref)
 
     @property
     def gt_phred_ll_homalt(self):
@@ -143,8 +229,7 @@ class EvalFamily(object):
     @gt_phred_ll_homalt.setter
     def gt_phred_ll_homalt(self, gt_phred_ll_homalt):
         if gt_phred_ll_homalt is not None:
-            assert len(gt_phred_ll_homalt) == len(self.family)
-            self._gt_phred_ll_homalt = gt_phred_ll_homalt
+            self._gt_phred_ll_homalt = self._check(gt_phred_ll_homalt)
 
     @property
     def gt_phred_ll_het(self):
@@ -153,8 +238,7 @@ class EvalFamily(object):
     @gt_phred_ll_het.setter
     def gt_phred_ll_het(self, gt_phred_ll_het):
         if gt_phred_ll_het is not None:
-            assert len(gt_phred_ll_het) == len(self.family)
-            self._gt_phred_ll_het = gt_phred_ll_het
+            self._gt_phred_ll_het = self._check(gt_phred_ll_het)
 
     def __getattr__(self, gt):
         assert self._gt_types is not None
@@ -162,24 +246,15 @@ class EvalFamily(object):
             if 'min_depth' in kwargs:
                 assert self._gt_depths is not None
             debug = kwargs.pop('debug', False)
-            flt = getattr(self.family, gt)(*args, **kwargs)
-            if flt is False or flt is None:
-                return False
             if gt == "comp_het_pair":
-                return flt
-            env = {s.sample_id: i for i, s in enumerate(self.family.subjects)}
+                return getattr(self.family, gt)(*args, **kwargs)
+            prepared = self.prepare(gt, *args, **kwargs)
             if debug:
-                print(flt, file=sys.stderr)
-            env['gt_types'] = self.gt_types
-            env['gt_quals'] = self.gt_quals
-            env['gt_depths'] = self.gt_depths
-            env['gt_phred_ll_homref'] = self.gt_phred_ll_homref
-            env['gt_phred_ll_het'] = self.gt_phred_ll_het
-            env['gt_phred_ll_homalt'] = self.gt_phred_ll_homalt
+                print(prepared.filter, file=sys.stderr)
             try:
-                return eval(flt, env)
+                return prepared()
             except:
-                print("attempted eval:", flt)
+                print("attempted eval:", prepared.filter)
                 raise
         return func
 
@@ -0,0 +1,240 @@
+"""
+The structure of the filters built by the inheritance models.
+
+Each expression made by a Filter (see pyeval.ostr) carries a tree of these
+nodes along with its string. The models build the tree with &, | and ~ and
+`simplify` then flattens nested and/or, folds True/False and drops repeated
+operands so that every implementation evaluates fewer comparisons.
+
+>>> a = Cmp('gt_types', 'kid', '==', 3)
+>>> b = Cmp('gt_types', 'mom', '==', 1)
+>>> simplify(And(And(a, b), And(b, True), a))
+And(Cmp('gt_types', 'kid', '==', 3), Cmp('gt_types', 'mom', '==', 1))
+>>> simplify(And(a, Or(a, b)))
+Cmp('gt_types', 'kid', '==', 3)
+>>> simplify(Or(And(a, False), Not(Not(b))))
+Cmp('gt_types', 'mom', '==', 1)
+"""
+import operator as op
+
+try:
+    reduce
+except NameError:
+    from functools import reduce
+
+
+class Node(object):
+    __slots__ = ('args', '_hash')
+
+    def __init__(self, *args):
+        self.args = args
+        self._hash = hash((self.__class__.__name__, args))
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.args == other.args
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return self._hash
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, ", ".join(repr(a) for a in self.args))
+
+
+class Ref(Node):
+    """the value of gt_field for a sample, e.g. gt_types[mom]"""
+    __slots__ = ()
+
+    @property
+    def field(self):
+        return self.args[0]
+
+    @property
+    def sample(self):
+        return self.args[1]
+
+
+class Cmp(Node):
+    """a comparison of a gt_field for a sample to a constant or a Ref"""
+    __slots__ = ()
+
+    @property
+    def field(self):
+        return self.args[0]
+
+    @property
+    def sample(self):
+        return self.args[1]
+
+    @property
+    def op(self):
+        return self.args[2]
+
+    @property
+    def value(self):
+        return self.args[3]
+
+
+class Raw(Node):
+    """an expression that was given only as a string."""
+    __slots__ = ()
+
+
+class And(Node):
+    __slots__ = ()
+
+
+class Or(Node):
+    __slots__ = ()
+
+
+class Not(Node):
+    __slots__ = ()
+
+
+def as_node(e):
+    """
+    the node for an expression, a constant or the result of a model (which
+    may be False, None or 'False').
+    """
+    if e is True or e is False or e is None:
+        return bool(e)
+    if e in ("True", "False"):
+        return e == "True"
+    node = getattr(e, 'node', None)
+    return Raw(str(e)) if node is None else node
+
+
+def fields(node):
+    """the set of gt_fields used by `node`."""
+    if isinstance(node, Ref):
+        return set([node.field])
+    if isinstance(node, Cmp):
+        return set([node.field]) | fields(node.value)
+    if isinstance(node, (And, Or, Not)):
+        return set().union(*[fields(a) for a in node.args])
+    return set()
+
+
+_ops = {'==': op.eq, '!=': op.ne, '<': op.lt, '<=': op.le, '>': op.gt, '>=': op.ge}
+
+
+def evaluate(node, value):
+    """
+    evaluate `node` where `value(gt_field, sample)` gives the value of a
+    field for a sample. Values can be scalars or numpy arrays.
+    """
+    if node is True or node is False:
+        return node
+    if isinstance(node, Cmp):
+        v = node.value
+        if isinstance(v, Ref):
+            v = value(v.field, v.sample)
+        return _ops[node.op](value(node.field, node.sample), v)
+    if isinstance(node, (And, Or)):
+        combine = op.and_ if isinstance(node, And) else op.or_
+        return reduce(combine, [evaluate(a, value) for a in node.args])
+    if isinstance(node, Not):
+        v = evaluate(node.args[0], value)
+        return ~v if hasattr(v, 'dtype') else not v
+    raise ValueError("can't evaluate %r" % (node,))
+
+
+def assume(node, known):
+    """
+    replace each comparison for which `known(cmp)` gives True or False with
+    that value and simplify. e.g. to find whether a filter can pass when
+    some samples don't have an alt allele.
+
+    >>> a = Cmp('gt_types', 'kid', '==', 1)
+    >>> assume(And(a, Cmp('gt_types', 'mom', '==', 0)), lambda c: False if c.sample == 'kid' else None)
+    False
+    """
+    def sub(n):
+        if isinstance(n, Cmp):
+            k = known(n)
+            return n if k is None else k
+        if isinstance(n, (And, Or, Not)):
+            return type(n)(*[sub(a) for a in n.args])
+        return n
+    return simplify(sub(node))
+
+
+def simplify(node):
+    """
+    flatten nested and/or, fold True/False/None and remove repeated operands
+    (including those absorbed by another operand, e.g. a & (a | b) is a).
+    """
+    if isinstance(node, Not):
+        a = simplify(node.args[0])
+        if a is True or a is False:
+            return not a
+        if isinstance(a, Not):
+            return a.args[0]
+        return Not(a)
+
+    if not isinstance(node, (And, Or)):
+        return node
+
+    klass = type(node)
+    dual = Or if klass is And else And
+    # True in an And (False in an Or) can be dropped, False (True) decides it.
+    identity = klass is And
+
+    args, seen = [], set()
+    for a in node.args:
+        if a is None: continue
+        a = simplify(a)
+        for b in (a.args if type(a) is klass else (a,)):
+            if b is identity: continue
+            if b is (not identity): return not identity
+            if b in seen: continue
+            seen.add(b)
+            args.append(b)
+
+    args = [a for a in args if not (type(a) is dual and any(x in seen for x in a.args))]
+    if len(args) == 0:
+        return identity
+    if len(args) == 1:
+        return args[0]
+    return klass(*args)
+
+
+def common(node):
+    """
+    return the sub-expressions that occur more than once in `node`, children
+    before their parents, so that they can be evaluated once and re-used.
+    """
+    counts, order = {}, []
+
+    def visit(n):
+        if not isinstance(n, Node) or isinstance(n, Ref):
+            return
+        if n in counts:
+            counts[n] += 1
+            return
+        counts[n] = 1
+        if isinstance(n, (And, Or, Not)):
+            for a in n.args:
+                visit(a)
+        order.append(n)
+
+    visit(node)
+    return [n for n in order if counts[n] > 1]
+
+
+def reorder(node, rate):
+    """
+    sort the operands of each and (or) so that those that pass least (most)
+    often are evaluated first. `rate` gives the pass rate of a node; the order
+    of operands with the same rate is kept.
+    """
+    if isinstance(node, Not):
+        return Not(reorder(node.args[0], rate))
+    if not isinstance(node, (And, Or)):
+        return node
+    sign = 1 if isinstance(node, And) else -1
+    args = sorted(node.args, key=lambda a: sign * rate(a))
+    return type(node)(*[reorder(a, rate) for a in args])
@@ -11,11 +11,54 @@ import itertools as it
 import operator as op
 import re
 
+from .tables import TruthTable
+
+_warned = set()
+# lists that collect warnings while plans are made.
+_captured = []
+
 def warn(msg):
-    if os.environ.get('GEMINI_WARN_OFF', '__X') == '__X':
-        sys.stderr.write(msg)
-        if not msg.endswith("\n"):
-            sys.stderr.write(msg)
+    """
+    write msg to stderr (unless GEMINI_WARN_OFF is set) the first time it's
+    seen.
+    """
+    if _captured:
+        _captured[-1].append(msg.rstrip("\n"))
+    if os.environ.get('GEMINI_WARN_OFF', '__X') != '__X' or msg in _warned:
+        return
+    _warned.add(msg)
+    sys.stderr.write(msg if msg.endswith("\n") else msg + "\n")
+
+
+class Plan(object):
+    """
+    what a model makes of a family's pedigree, found once: `filter` is the
+    generated filter, `feasible` is False when it can never pass (e.g.
+    auto_rec with no affecteds) so the family can be skipped and `warnings`
+    are the warnings from generating it. A feasible family with warnings is
+    `reduced`: it's tested with less than the model wants (e.g. auto_dom for
+    an affected without parents).
+    """
+
+    __slots__ = ('model', 'filter', 'feasible', 'warnings')
+
+    def __init__(self, family, model, *args, **kwargs):
+        self.model = model
+        self.warnings = []
+        _captured.append(self.warnings)
+        try:
+            self.filter = getattr(family, model)(*args, **kwargs)
+        finally:
+            _captured.pop()
+        self.feasible = not (self.filter is False or str(self.filter) == 'False')
+
+    @property
+    def reduced(self):
+        return self.feasible and len(self.warnings) > 0
+
+    def __repr__(self):
+        state = "never" if not self.feasible else ("reduced" if self.reduced else "ok")
+        return "Plan(%s:%s)" % (self.model, state)
 
 try:
     reduce
@@ -45,14 +88,41 @@ sex_lookup = {'1': 'male', '2': 'female',
                1: 'male', 2: 'female',
                'male': 'male', 'female': 'female'}
 
+class _Generation(object):
+    """
+    bumped whenever a sample's id, phenotype, sex, parents or index (_i)
+    change so that
+    anything derived from a pedigree (e.g. compiled filters) can cheaply tell
+    when it may be stale.
+    """
+    value = 0
+
+def pedigree_generation():
+    return _Generation.value
+
+def _pedigree_property(slot):
+    def fget(self):
+        return getattr(self, slot)
+    def fset(self, value):
+        setattr(self, slot, value)
+        _Generation.value += 1
+    return property(fget, fset)
+
 def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
     class Sample(object):
 
-        __slots__ = ('sample_id', 'name', 'affected', 'sex', 'mom', 'dad',
-                     'family_id', '_i')
+        __slots__ = ('_sample_id', 'name', '_affected', '_sex', '_mom', '_dad',
+                     'family_id', '_index')
 
         valid_gts = None
 
+        sample_id = _pedigree_property('_sample_id')
+        affected = _pedigree_property('_affected')
+        sex = _pedigree_property('_sex')
+        mom = _pedigree_property('_mom')
+        dad = _pedigree_property('_dad')
+        _i = _pedigree_property('_index')
+
         def __init__(self, sample_id, affected, sex=None, name=None,
                      family_id=None):
             #assert isinstance(sample_id, (long, int)), sample_id
@@ -126,9 +196,105 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
                     yield toks
             return klass._from_gen(agen(), order=order)
 
+        @classmethod
+        def from_family(klass, family, sample_id=None):
+            """
+            copy the pedigree of a Family (e.g. from another implementation
+            of make_classes) so that it generates filters for this one.
+            `sample_id` is an optional function that gives the sample_id of
+            the copy of each Sample.
+            """
+            copies = {}
+            for s in family.subjects:
+                sid = s.sample_id if sample_id is None else sample_id(s)
+                c = copies[id(s)] = Sample(sid, s.affected, sex=s.sex,
+                                           name=s.name, family_id=s.family_id)
+                c._i = s._i
+            for s in family.subjects:
+                c = copies[id(s)]
+                c.mom = None if s.mom is None else copies.get(id(s.mom))
+                c.dad = None if s.dad is None else copies.get(id(s.dad))
+            return klass([copies[id(s)] for s in family.subjects], family.family_id)
+
+        @classmethod
+        def from_pedigree(klass, pedigree, family_ids=None):
+            """
+            return a dict keyed by family_id of the families (all or those in
+            `family_ids`) of an inheritance.pedigree.Pedigree.
+            """
+            sexes = {1: 'male', 2: 'female'}
+            affecteds = {1: False, 2: True}
+            columns = (pedigree.sample_ids, pedigree.index, pedigree.affected, pedigree.sex,
+                       pedigree.mom, pedigree.dad)
+            if family_ids is None:
+                views = list(pedigree)
+                # lists are much faster than numpy arrays to index 1 at a time.
+                columns = [c.tolist() for c in columns]
+            else:
+                views = [pedigree[f] for f in family_ids]
+            fams = {}
+            for view in views:
+                start, stop = view.start, view.stop
+                if family_ids is None:
+                    sids, idxs, affected, sex, moms, dads = (c[start:stop] for c in columns)
+                else:
+                    sids, idxs, affected, sex, moms, dads = (c[start:stop].tolist() for c in columns)
+                samples = []
+                # set the slots directly; the pedigree generation is bumped
+                # once below rather than for each attribute.
+                for sid, i, a, x in zip(sids, idxs, affected, sex):
+                    s = Sample.__new__(Sample)
+                    s._sample_id = s.name = sid
+                    s._affected, s._sex = affecteds.get(a), sexes.get(x)
+                    s.family_id, s._index = view.family_id, i
+                    samples.append(s)
+                for s, mom, dad in zip(samples, moms, dads):
+                    s._mom = None if mom < 0 else samples[mom - start]
+                    s._dad = None if dad < 0 else samples[dad - start]
+                fams[view.family_id] = klass(samples, view.family_id)
+            _Generation.value += 1
+            return fams
+
         def __len__(self):
             return len(self.subjects)
 
+        def truth_table(self, model, *args, **kwargs):
+            """
+            return a TruthTable with the result of `model` for every
+            combination of genotypes in the family. Tables are kept for each
+            model and set of arguments until the pedigree changes.
+            """
+            key = (model, args, tuple(sorted(kwargs.items())))
+            tables = self.__dict__.setdefault('_tables', {})
+            pedigree = self.pedigree_key()
+            if key not in tables or tables[key][0] != pedigree:
+                tables[key] = (pedigree, TruthTable(self, self.plan(model, *args, **kwargs).filter))
+            return tables[key][1]
+
+        def plan(self, model, *args, **kwargs):
+            """
+            return the Plan for `model` with these arguments: the filter and
+            whether the family can ever match. Plans are kept until the
+            pedigree changes so the checks of the pedigree (and their
+            warnings) happen once.
+            """
+            key = (model, args, tuple(sorted(kwargs.items())))
+            plans = self.__dict__.setdefault('_plans', {})
+            pedigree = self.pedigree_key()
+            if key not in plans or plans[key][0] != pedigree:
+                plans[key] = (pedigree, Plan(self, model, *args, **kwargs))
+            return plans[key][1]
+
+        def pedigree_key(self):
+            """
+            hashable summary of everything about the family that the generated
+            filters depend on.
+            """
+            return (self.family_id,) + tuple((s.sample_id, s._i, s.affected, s.sex,
+                                              s.mom and s.mom.sample_id,
+                                              s.dad and s.dad.sample_id)
+                                             for s in self.subjects)
+
         def famphase(self, gt_types, gt_phases, gt_bases,
                      _splitter=re.compile("\||/"),
                      length_check=True):
@@ -254,33 +420,82 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
             return "%s([%s])" % (self.__class__.__name__,
                                ", ".join(repr(s) for s in self.subjects))
 
+        def _roles(self):
+            # the samples in each role and their index arrays, kept until
+            # a sample changes (see pedigree_generation) or subjects is
+            # changed or replaced. The lists are shared; don't modify them.
+            # The role properties return copies; the models read these directly.
+            key = (pedigree_generation(), id(self.subjects), len(self.subjects))
+            cache = self.__dict__.get('_role_cache')
+            if cache is not None and cache[0] == key:
+                return cache[1]
+            subjects = self.subjects
+            affecteds = [s for s in subjects if s.affected]
+            roles = {
+                'subjects': subjects,
+                'males': [s for s in subjects if s.sex in ('1', 1, 'male')],
+                'females': [s for s in subjects if s.sex in ('2', 2, 'female')],
+                'affecteds': affecteds,
+                'affecteds_with_parent': [s for s in affecteds if not None in (s.mom, s.dad)],
+                'samples_with_parent': [s for s in subjects if not None in (s.mom, s.dad)],
+                'unaffecteds': [s for s in subjects if s.affected is False],
+                'unknown': [s for s in subjects if s.affected is None],
+                '_index': {},
+            }
+            self.__dict__['_role_cache'] = (key, roles)
+            return roles
+
         @property
         def males(self):
-            return [s for s in self.subjects if s.sex in ('1', 1, 'male')]
+            return list(self._roles()['males'])
 
         @property
         def females(self):
-            return [s for s in self.subjects if s.sex in ('2', 2, 'female')]
+            return list(self._roles()['females'])
 
         @property
         def affecteds(self):
-            return [s for s in self.subjects if s.affected]
+            return list(self._roles()['affecteds'])
 
         @property
         def affecteds_with_parent(self):
-            return [s for s in self.affecteds if not None in (s.mom, s.dad)]
+            return list(self._roles()['affecteds_with_parent'])
 
         @property
         def samples_with_parent(self):
-            return [s for s in self.subjects if not None in (s.mom, s.dad)]
+            return list(self._roles()['samples_with_parent'])
 
         @property
         def unaffecteds(self):
-            return [s for s in self.subjects if s.affected is False]
+            return list(self._roles()['unaffecteds'])
 
         @property
         def unknown(self):
-            return [s for s in self.subjects if s.affected is None]
+            return list(self._roles()['unknown'])
+
+        def index(self, role='subjects'):
+            """
+            a numpy array of Sample._i for the samples in `role` (e.g.
+            'affecteds' or 'males'), or of the _i of each subject's mom or
+            dad (-1 for none) for 'moms' or 'dads'. Arrays are kept until a
+            sample changes; don't modify them.
+            """
+            roles = self._roles()
+            arrays = roles['_index']
+            try:
+                return arrays[role]
+            except KeyError:
+                pass
+            import numpy as np
+            if role in ('moms', 'dads'):
+                parent = role[:3]
+                values = [-1 if getattr(s, parent) is None else getattr(s, parent)._i
+                          for s in roles['subjects']]
+            else:
+                values = [s._i for s in roles[role]]
+            a = arrays[role] = np.array(values, dtype=np.int64)
+            a.flags.writeable = False
+            return a
 
         # so we can do, e.g. fam.gts and get the list of required strings.
         def __getattr__(self, gt_field):
@@ -289,35 +504,39 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
             return [getattr(s, gt_field) for s in self.subjects]
 
         def _restrict_to_min_depth(self, min_depth, unknowns=False):
+            roles = self._roles()
+            affecteds, unaffecteds, unknown = roles['affecteds'], roles['unaffecteds'], roles['unknown']
             if min_depth is not None and min_depth > 0:
-                if len(self.affecteds):
-                    af = reduce(op.and_, [s.gt_depths >= min_depth for s in self.affecteds])
+                if len(affecteds):
+                    af = reduce(op.and_, [s.gt_depths >= min_depth for s in affecteds])
                 else:
                     af = None
-                if len(self.unaffecteds):
-                    un = reduce(op.and_, [s.gt_depths >= min_depth for s in self.unaffecteds])
+                if len(unaffecteds):
+                    un = reduce(op.and_, [s.gt_depths >= min_depth for s in unaffecteds])
                 else:
                     un = None
-                if unknowns and len(self.unknown):
-                    return combine_and(reduce(op.and_, [s.gt_depths >= min_depth for s in self.unknown]), af, un)
+                if unknowns and len(unknown):
+                    return combine_and(reduce(op.and_, [s.gt_depths >= min_depth for s in unknown]), af, un)
                 return combine_and(af, un)
             else:
                 return None
 
         def _restrict_to_min_gq(self, min_gq, unknowns=False):
+            roles = self._roles()
+            affecteds, unaffecteds, unknown = roles['affecteds'], roles['unaffecteds'], roles['unknown']
             if min_gq is None or min_gq <= 0:
                 return None
 
-            if len(self.affecteds):
-                af = reduce(op.and_, [s.gt_quals >= min_gq for s in self.affecteds])
+            if len(affecteds):
+                af = reduce(op.and_, [s.gt_quals >= min_gq for s in affecteds])
             else:
                 af = None
-            if len(self.unaffecteds):
-                un = reduce(op.and_, [s.gt_quals >= min_gq for s in self.unaffecteds])
+            if len(unaffecteds):
+                un = reduce(op.and_, [s.gt_quals >= min_gq for s in unaffecteds])
             else:
                 un = None
-            if unknowns and len(self.unknown):
-                return combine_and(reduce(op.and_, [s.gt_quals >= min_gq for s in self.unknown]), af, un)
+            if unknowns and len(unknown):
+                return combine_and(reduce(op.and_, [s.gt_quals >= min_gq for s in unknown]), af, un)
             return combine_and(af, un)
 
         def auto_dom(self, min_depth=0, gt_ll=False, strict=True,
@@ -327,29 +546,31 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
             parent.
             Parents of affected can't have unknown phenotype (for at least 1 kid)
             """
-            if len(self.affecteds) == 0:
+            roles = self._roles()
+            affecteds, unaffecteds = roles['affecteds'], roles['unaffecteds']
+            if len(affecteds) == 0:
                 warn("WARNING: no affecteds in family %s\n" % self.family_id)
                 if strict:
                     return 'False'
-            af = reduce(op.and_, [s.gt_types == HET for s in self.affecteds]) if len(self.affecteds) else True
-            if len(self.unaffecteds) and only_affected:
-                un = reduce(op.and_, [(s.gt_types != HET) & (s.gt_types != HOM_ALT) for s in self.unaffecteds])
+            af = reduce(op.and_, [s.gt_types == HET for s in affecteds]) if len(affecteds) else True
+            if len(unaffecteds) and only_affected:
+                un = reduce(op.and_, [(s.gt_types != HET) & (s.gt_types != HOM_ALT) for s in unaffecteds])
             else:
                 un = None
             depth = self._restrict_to_min_depth(min_depth)
             quals = self._restrict_to_min_gq(min_gq)
             if gt_ll:
-                if len(self.affecteds):
-                    af = reduce(op.and_, [s.gt_phred_ll_het <= gt_ll for s in self.affecteds]) & af
-                if len(self.unaffecteds) and only_affected:
+                if len(affecteds):
+                    af = reduce(op.and_, [s.gt_phred_ll_het <= gt_ll for s in affecteds]) & af
+                if len(unaffecteds) and only_affected:
                     un = reduce(op.and_, [s.gt_phred_ll_het > gt_ll for s in
-                                           self.unaffecteds]) & un
+                                           unaffecteds]) & un
             # need at least 1 kid with parent who has the mutation
             # parents can't have unkown phenotype.
             kid_with_known_parents = False
             # all affected kids must have at least 1 affected parent (or no parents)
             kid_with_parents = False
-            for kid in self.affecteds:
+            for kid in affecteds:
                 # if they have no parents, don't require it
                 if kid.mom is None and kid.dad is None:
                     continue
@@ -369,7 +590,7 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
                 return 'False'
 
             if not kid_with_parents:
-                if len(self.affecteds) > 0:
+                if len(affecteds) > 0:
                     warn("WARNING: using affected without parents for family %s for autosomal dominant test. Use strict to prevent this.\n" % self.family_id)
             return combine_and(af, un, depth, quals)
 
@@ -380,7 +601,7 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
             #. parents should be unaffected and hom_ref
             #. both parents must be present.
             """
-            affecteds = [x for x in self.affecteds if x.mom is not None and x.dad is not None]
+            affecteds = [x for x in self._roles()['affecteds'] if x.mom is not None and x.dad is not None]
             if len(affecteds) == 0:
                 warn("WARNING: no affecteds in family %s. skipping\n" % self.family_id)
                 return False
@@ -425,7 +646,8 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
             #. mothers of affected males must be het (and affected)
             #. at least 1 parent of affected females must be het (and affected).
             """
-            affecteds = self.affecteds
+            roles = self._roles()
+            affecteds, unaffecteds = roles['affecteds'], roles['unaffecteds']
             if len(affecteds) == 0:
                 warn("WARNING: no affecteds in family %s. skipping\n" % self.family_id)
                 return False
@@ -443,8 +665,8 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
                     af = None
 
             # unaffecteds must be hom_ref
-            if len(self.unaffecteds) > 0:
-                un = reduce(op.and_, [s.gt_types == HOM_REF for s in self.unaffecteds])
+            if len(unaffecteds) > 0:
+                un = reduce(op.and_, [s.gt_types == HOM_REF for s in unaffecteds])
             else:
                 un = None
 
@@ -452,7 +674,7 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
                 if a is None or b is None: return False
                 return a.sample_id == b.sample_id and a.family_id == b.family_id
 
-            for parent in self.affecteds:
+            for parent in affecteds:
                 kids = [k for k in self.subjects if is_parent(parent, k.dad)]
                 for kid in kids:
                     # girls of affected dad must be affected
@@ -491,7 +713,8 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
 
             NOTE: could add something for obligate carriers -- where unaffected females are het
             """
-            affecteds = self.affecteds
+            roles = self._roles()
+            affecteds, unaffecteds, males = roles['affecteds'], roles['unaffecteds'], roles['males']
             if len(affecteds) == 0:
                 warn("WARNING: no affecteds in family %s\n" % self.family_id)
                 return False
@@ -502,16 +725,16 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
             except TypeError:
                 female_af = None
             try:
-                female_un = reduce(op.and_, [((s.gt_types == HET) | (s.gt_types == HOM_REF)) for s in self.unaffecteds if s.sex == 'female'])
+                female_un = reduce(op.and_, [((s.gt_types == HET) | (s.gt_types == HOM_REF)) for s in unaffecteds if s.sex == 'female'])
             except TypeError:
                 female_un = None
 
             try:
-                male_af = reduce(op.and_, [(s.gt_types != UNKNOWN) & (s.gt_types != HOM_REF) for s in self.males if s.affected])
+                male_af = reduce(op.and_, [(s.gt_types != UNKNOWN) & (s.gt_types != HOM_REF) for s in males if s.affected])
             except TypeError:
                 male_af = None
             try:
-                male_un = reduce(op.and_, [(s.gt_types == HOM_REF) for s in self.males if not s.affected])
+                male_un = reduce(op.and_, [(s.gt_types == HOM_REF) for s in males if not s.affected])
             except TypeError:
                 male_un = None
 
@@ -531,19 +754,21 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
             """
             If strict, then if parents exist, they must be het for all affecteds
             """
-            if len(self.affecteds) == 0:
+            roles = self._roles()
+            affecteds, unaffecteds = roles['affecteds'], roles['unaffecteds']
+            if len(affecteds) == 0:
                 warn("WARNING: no affecteds in family %s\n" % self.family_id)
                 return False
-            af = reduce(op.and_, [s.gt_types == HOM_ALT for s in self.affecteds])
-            if only_affected and len(self.unaffecteds) != 0:
-                un = reduce(op.and_, [s.gt_types != HOM_ALT for s in self.unaffecteds])
+            af = reduce(op.and_, [s.gt_types == HOM_ALT for s in affecteds])
+            if only_affected and len(unaffecteds) != 0:
+                un = reduce(op.and_, [s.gt_types != HOM_ALT for s in unaffecteds])
             else:
                 un = None
             if strict:
                 # if parents exist, they must be het or affected for all affecteds
                 # if both parents are not het then it's a de novo.
                 usable_kid = False
-                for kid in self.affecteds:
+                for kid in affecteds:
                     usable_kid = usable_kid or (kid.mom and kid.dad)
                     for parent in (kid.mom, kid.dad):
                         if parent is not None:
@@ -560,10 +785,10 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
             quals = self._restrict_to_min_gq(min_gq)
             if gt_ll:
                 af &= reduce(op.and_, [s.gt_phred_ll_homalt <= gt_ll for s in
-                                       self.affecteds])
-                if only_affected and len(self.unaffecteds) > 0:
+                                       affecteds])
+                if only_affected and len(unaffecteds) > 0:
                     un &= reduce(op.and_, [s.gt_phred_ll_homalt > gt_ll for s in
-                                           self.unaffecteds])
+                                           unaffecteds])
 
             return combine_and(af, un, depth, quals)
 
@@ -575,30 +800,32 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
             if strict, all affected kids must have unaffected parents.
 
             """
-            if len(self.affecteds) == 0:
+            roles = self._roles()
+            affecteds, unaffecteds = roles['affecteds'], roles['unaffecteds']
+            if len(affecteds) == 0:
                 warn("WARNING: no affecteds in family %s\n" % self.family_id)
                 return 'False'
-            af = reduce(op.and_, [s.gt_types == HET for s in self.affecteds])
+            af = reduce(op.and_, [s.gt_types == HET for s in affecteds])
             un = True
-            have_un = len(self.unaffecteds) != 0
+            have_un = len(unaffecteds) != 0
             if only_affected and have_un:
-                un = reduce(op.and_, [s.gt_types == HOM_REF for s in self.unaffecteds])
+                un = reduce(op.and_, [s.gt_types == HOM_REF for s in unaffecteds])
             if gt_ll:
-                af &= reduce(op.and_, [s.gt_phred_ll_het <= gt_ll for s in self.affecteds])
+                af &= reduce(op.and_, [s.gt_phred_ll_het <= gt_ll for s in affecteds])
                 if only_affected and have_un:
-                    un &= reduce(op.and_, [s.gt_phred_ll_homref <= gt_ll for s in self.unaffecteds])
+                    un &= reduce(op.and_, [s.gt_phred_ll_homref <= gt_ll for s in unaffecteds])
 
             if only_affected and have_un:
                 un2 = reduce(op.and_, [s.gt_types == HOM_ALT for s in
-                                       self.unaffecteds])
+                                       unaffecteds])
                 if gt_ll and have_un:
                     un2 &= reduce(op.and_, [s.gt_phred_ll_homalt <= gt_ll for s
-                                            in self.unaffecteds])
+                                            in unaffecteds])
                 un |= un2
 
             # at least 1 affected kid must have unaffected parents
             un_parents = False
-            for kid in self.affecteds:
+            for kid in affecteds:
                 if kid.mom and kid.mom.affected is False and kid.dad and kid.dad.affected is False:
                     un_parents = True
                 # can't have a parent with the variant
@@ -619,7 +846,7 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
             if strict:
                 # if a parent is affected it's not de novo.
                 any_with_un = False
-                for kid in self.affecteds:
+                for kid in affecteds:
                     for parent in (kid.mom, kid.dad):
                         if parent is not None and parent.affected is False:
                             any_with_un = True
@@ -634,10 +861,11 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
             kid == HET and dad, mom == HOM_REF or dad, mom == HOM_ALT
             only use kids with both parents present.
             """
+            roles = self._roles()
             if only_affected:
-                subset = self.affecteds_with_parent
+                subset = roles['affecteds_with_parent']
             else:
-                subset = self.samples_with_parent
+                subset = roles['samples_with_parent']
             if len(subset) == 0: return 'False'
 
             depth = self._restrict_to_min_depth(min_depth, unknowns=not only_affected)
@@ -659,12 +887,13 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
 
         def mendel_implausible_denovo(self, min_depth=0, gt_ll=False,
                 only_affected=False, min_gq=0):
+            roles = self._roles()
             # everyone is homozygote. kid is opposit of parents.
             # only use kids with both parents present.
             if only_affected:
-                subset = self.affecteds_with_parent
+                subset = roles['affecteds_with_parent']
             else:
-                subset = self.samples_with_parent
+                subset = roles['samples_with_parent']
             if len(subset) == 0: return 'False'
 
             depth = self._restrict_to_min_depth(min_depth, unknowns=not only_affected)
@@ -685,12 +914,13 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
 
         def mendel_uniparental_disomy(self, min_depth=0, gt_ll=False,
                                       only_affected=False, min_gq=0):
+            roles = self._roles()
             # parents are opposite homs, kid matches one of them (but should be
             # het).
             if only_affected:
-                subset = self.affecteds_with_parent
+                subset = roles['affecteds_with_parent']
             else:
-                subset = self.samples_with_parent
+                subset = roles['samples_with_parent']
             if len(subset) == 0: return 'False'
             depth = self._restrict_to_min_depth(min_depth, unknowns=not only_affected)
             quals = self._restrict_to_min_gq(min_gq, unknowns=not only_affected)
@@ -723,11 +953,12 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
 
         def mendel_LOH(self, min_depth=0, gt_ll=False, only_affected=False,
                 min_gq=0):
+            roles = self._roles()
             # kid and one parent are opposite homozygotes other parent is het.
             if only_affected:
-                subset = self.affecteds_with_parent
+                subset = roles['affecteds_with_parent']
             else:
-                subset = self.samples_with_parent
+                subset = roles['samples_with_parent']
             if len(subset) == 0: return 'False'
 
             depth = self._restrict_to_min_depth(min_depth, unknowns=not only_affected)
@@ -825,10 +1056,11 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
             + if either parent is phased at both sites and matches the kid, exclude.
             + if either parent is het at both sites, priority is reduced
             """
+            samples_with_parent = self._roles()['samples_with_parent']
 
             # already phased before sending here.
             ret = {'candidates': [], 'priority': 4}
-            for kid in self.samples_with_parent:
+            for kid in samples_with_parent:
                 if gt_nums1[kid._i] == gt_nums2[kid._i]: continue
                 if not (gt_types1[kid._i] == HET and gt_types2[kid._i] == HET): continue
                 #if not (gt_phases1[kid._i] and gt_phases2[kid._i]): continue
@@ -884,6 +1116,8 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
             3. It's an unphased sample and unphased parents where all are hets
                at the pair.
             """
+            roles = self._roles()
+            affecteds, unaffecteds = roles['affecteds'], roles['unaffecteds']
             if gt_phases1 is None:
                 gt_phases1 = ["|" in b for b in gt_bases1]
             if gt_phases2 is None:
@@ -927,7 +1161,6 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
                                                    gt_types2, gt_nums2,
                                                    gt_phases1, gt_phases2)
 
-            unaffecteds = self.unaffecteds
             for un in unaffecteds:
                 if gt_types2[un._i] == HOM_ALT or gt_types1[un._i] == HOM_ALT:
                     return {'candidate': False}
@@ -938,7 +1171,7 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
                    'affected_skipped': [], 'candidates': []}
 
             aff = None
-            for aff in self.affecteds:
+            for aff in affecteds:
                 if gt_types1[aff._i] != HET or gt_types2[aff._i] != HET:
                     ret['affected_skipped'].append(aff)
                     ret['candidate'] = False
@@ -1026,10 +1259,12 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
                      only_affected=True,
                      pattern_only=False,
                      min_gq=0):
+            roles = self._roles()
+            affecteds, unaffecteds = roles['affecteds'], roles['unaffecteds']
 
             if pattern_only:
                 af, un = None, None
-                for i, kid in enumerate(self.samples_with_parent):
+                for i, kid in enumerate(roles['samples_with_parent']):
 
                     icmp = (kid.gt_types == HET) & (kid.mom.gt_types != HOM_ALT) \
                                                  & (kid.dad.gt_types != HOM_ALT) \
@@ -1042,26 +1277,26 @@ def make_classes(valid_gts, cfilter, HOM_REF, HET, UNKNOWN, HOM_ALT):
             else:
                 # all affecteds must be het at both sites
                 af = None
-                if len(self.affecteds):
-                    af = reduce(op.or_, [s.gt_types == HET for s in self.affecteds])
+                if len(affecteds):
+                    af = reduce(op.or_, [s.gt_types == HET for s in affecteds])
 
                 # no unaffected can be homozygous alt at either site.
                 un = None
-                if len(self.unaffecteds):
-                    un = reduce(op.and_, [s.gt_types != HOM_ALT for s in self.unaffecteds])
+                if len(unaffecteds):
+                    un = reduce(op.and_, [s.gt_types != HOM_ALT for s in unaffecteds])
 
-                for kid in self.samples_with_parent:
+                for kid in roles['samples_with_parent']:
                     if not kid.affected: continue
                     un = (kid.mom.gt_types != UNKNOWN) & un
                     un = (kid.dad.gt_types != UNKNOWN) & un
 
                 if gt_ll:
-                    if len(self.affecteds):
+                    if len(affecteds):
                         af &= reduce(op.and_, [s.gt_phred_ll_het <= gt_ll for s in
-                            self.affecteds])
-                    if len(self.unaffecteds):
+                            affecteds])
+                    if len(unaffecteds):
                         un = reduce(op.and_, [s.gt_phred_ll_homalt > gt_ll for s in
-                            self.unaffecteds], un)
+                            unaffecteds], un)
 
             depth = self._restrict_to_min_depth(min_depth)
             quals = self._restrict_to_min_gq(min_gq)
@@ -0,0 +1,261 @@
+"""
+A numpy implementation of the inheritance models that evaluates a block of
+variants at once. Each gt_field is a 2-D array of variants (rows) x samples
+(columns) and each model returns a boolean vector with 1 value per variant.
+
+>>> import numpy as np
+>>> mom, dad, kid = Sample('mom', False), Sample('dad', False), Sample('kid', True)
+>>> kid.mom, kid.dad = mom, dad
+>>> f = Family([mom, dad, kid], 'trio')
+>>> f.auto_rec()
+'(((gt_types[:, kid] == 3) & (gt_types[:, mom] == 1)) & (gt_types[:, dad] == 1)) & ((gt_types[:, mom] != 3) & (gt_types[:, dad] != 3))'
+
+>>> bfam = BlockFamily(f)
+>>> bfam.gt_types = np.array([[1, 1, 3],
+...                           [1, 1, 1],
+...                           [0, 1, 3]])
+>>> bfam.auto_rec()
+array([ True, False, False])
+>>> bfam.de_novo()
+array([False, False, False])
+"""
+from __future__ import print_function
+
+import numpy as np
+
+from .inheritance import make_classes
+from .evalfam import EvalFamily, Prepared
+from . import pyeval
+from .pyeval import simplified
+from .expr import And, Or, Not, Cmp, Ref, as_node, common
+from .prefilter import Carriers
+
+
+class nstr(pyeval.ostr):
+    index = "%s[:, %s]"
+    and_, or_, not_ = " & ", " | ", "~"
+
+
+class Filter(pyeval.Filter):
+    expr = nstr
+
+Sample, Family = make_classes(pyeval.valid_gts, Filter, *range(4))
+
+
+class BlockPrepared(Prepared):
+    """
+    A Prepared model that always returns a boolean vector, even when the
+    filter is a constant (e.g. 'False' for a family that can't match).
+    """
+
+    __slots__ = ()
+
+    def __call__(self, **arrays):
+        for k, v in arrays.items():
+            arrays[k] = np.atleast_2d(v)
+        res = Prepared.__call__(self, **arrays)
+        if np.ndim(res) == 0:
+            gt_types = arrays.get('gt_types', self.efam.gt_types)
+            res = np.full(len(gt_types), bool(res))
+        return res
+
+
+class BlockFamily(EvalFamily):
+    """
+    Like EvalFamily, but each gt_field is a block of variants x family
+    samples. A Family from another implementation (e.g. pyeval) is copied to
+    the numpy implementation.
+    """
+
+    __slots__ = ()
+
+    prepared_class = BlockPrepared
+
+    def __init__(self, family, fam_id=None, gt_types=None, gt_depths=None):
+        if isinstance(family, dict):
+            if len(family) != 1:
+                raise Exception("only single families supported in BlockFamily")
+            family = next(iter(family.values()))
+        if not isinstance(family, Family):
+            family = Family.from_family(family)
+        EvalFamily.__init__(self, family, fam_id, gt_types, gt_depths)
+
+    def _check(self, arr):
+        arr = np.asarray(arr)
+        assert arr.ndim == 2 and arr.shape[1] == len(self.family), arr.shape
+        return arr
+
+
+def _column(s):
+    # integer sample_ids are 1-based so this gives filters indexed by the
+    # column of the sample in the full array, e.g. gt_types[:, 1234].
+    return s._i + 1
+
+
+def _tuple(items):
+    """the source of a tuple of the expressions in items; () when empty."""
+    return "(%s)" % "".join("%s, " % i for i in items)
+
+
+class CohortEvaluator(object):
+    """
+    Evaluate a model for every family at once on the arrays for all samples
+    (in the order used for Sample._i, e.g. from Family.from_ped(ped,
+    order=vcf_order)). Filters index the shared arrays directly so there is
+    no per-family slicing.
+
+    Calling with 1-D arrays (a single variant) returns a boolean vector with
+    1 value per family. Calling with 2-D arrays (variants x samples) returns a
+    families x variants matrix.
+
+    For a single variant, families that need an affected with an alt allele
+    to match the model are only evaluated if one has it (see
+    prefilter.Carriers). Most families don't carry a rare variant so most
+    are skipped.
+
+    >>> fams = pyeval.Family.from_ped('''
+    ... f1 dad 0 0 1 1
+    ... f1 mom 0 0 2 1
+    ... f1 kid dad mom 1 2
+    ... f2 kid2 0 0 1 2'''.strip())
+    >>> cohort = CohortEvaluator(fams, 'de_novo')
+    >>> cohort.family_ids
+    ['f1', 'f2']
+    >>> cohort(gt_types=np.array([0, 0, 1, 1]))
+    array([ True, False])
+    >>> cohort(gt_types=np.array([[0, 0, 1, 1], [0, 1, 1, 1]]))
+    array([[ True, False],
+           [False, False]])
+    """
+
+    def __init__(self, families, model, *args, **kwargs):
+        if isinstance(families, dict):
+            families = list(families.values())
+        self.family_ids = [f.family_id for f in families]
+        self.model = model
+
+        scalar, block = [], []
+        name = "<cohort:%s>" % model
+        # the filter of each family for single variants.
+        self._each = {}
+        for k, f in enumerate(families):
+            # families that can't match are skipped without making filters.
+            if not f.plan(model, *args, **kwargs).feasible:
+                scalar.append('False')
+                continue
+            flt = simplified(getattr(pyeval.Family.from_family(f, sample_id=_column), model)(*args, **kwargs))
+            if flt == 'False':
+                scalar.append('False')
+                continue
+            scalar.append("bool(%s)" % flt)
+            self._each[k] = compile(scalar[-1], name, "eval")
+            flt = simplified(getattr(Family.from_family(f, sample_id=_column), model)(*args, **kwargs))
+            # evaluate sub-expressions shared within the family once per block.
+            temps = {}
+            for j, sub in enumerate(common(flt.node) if flt.node else ()):
+                tmp = "_t%d_%d" % (k, j)
+                block.append("%s = %s" % (tmp, nstr.render(sub, temps)))
+                temps[sub] = tmp
+            block.append("out[%d] = %s" % (k, nstr.render(flt.node, temps) if temps else flt))
+
+        self._scalar = compile(_tuple(scalar), name, "eval")
+        self._block = compile("\n".join(block), name, "exec")
+        self.carriers = Carriers(families, [model], *args, **kwargs)
+        if self.carriers.always.all():
+            self.carriers = None
+
+    def __len__(self):
+        return len(self.family_ids)
+
+    def __call__(self, gt_types, **arrays):
+        arrays['gt_types'] = gt_types
+        if np.ndim(gt_types) == 1:
+            if self.carriers is None:
+                return np.array(eval(self._scalar, arrays), dtype=bool)
+            out = np.zeros(len(self), dtype=bool)
+            each = self._each
+            for k in np.flatnonzero(self.carriers(gt_types)).tolist():
+                if k in each:
+                    out[k] = eval(each[k], arrays)
+            return out
+        out = arrays['out'] = np.zeros((len(self), len(gt_types)), dtype=bool)
+        exec(self._block, arrays)
+        return out
+
+
+class ModelsEvaluator(object):
+    """
+    Evaluate several models for every family in 1 pass over a variant (1-D
+    arrays for all samples as for CohortEvaluator). Each comparison of a
+    gt_field to a constant (e.g. gt_types == HET or gt_depths >= 10) is done
+    once per variant for all samples and each sub-expression shared by
+    models or families is evaluated once. Calling returns a models x
+    families boolean matrix.
+
+    >>> fams = pyeval.Family.from_ped('''
+    ... f1 dad 0 0 1 1
+    ... f1 mom 0 0 2 1
+    ... f1 kid dad mom 1 2
+    ... f2 kid2 0 0 1 2'''.strip())
+    >>> ev = ModelsEvaluator(fams, ('de_novo', 'auto_rec'), min_depth=10)
+    >>> ev(np.array([0, 0, 1, 3]), gt_depths=np.array([20, 20, 20, 20]))
+    array([[ True, False],
+           [False,  True]])
+    >>> print(ev.source.split("\\n")[0])
+    _p0 = (gt_types == 1).tolist()
+    """
+
+    def __init__(self, families, models, *args, **kwargs):
+        if isinstance(families, dict):
+            families = list(families.values())
+        self.family_ids = [f.family_id for f in families]
+        self.models = tuple(models)
+
+        nodes = []
+        for model in self.models:
+            row = []
+            for f in families:
+                if not f.plan(model, *args, **kwargs).feasible:
+                    row.append(False)
+                    continue
+                flt = getattr(pyeval.Family.from_family(f, sample_id=_column), model)(*args, **kwargs)
+                row.append(as_node(simplified(flt)))
+            nodes.append(row)
+
+        self._preds, temps, lines = {}, {}, []
+        shared = [n for row in nodes for n in row if n is not True and n is not False]
+        for j, sub in enumerate(common(And(*shared)) if shared else ()):
+            if isinstance(sub, Cmp) and not isinstance(sub.value, Ref):
+                continue
+            name = "_t%d" % j
+            lines.append("%s = %s" % (name, self._render(sub, temps)))
+            temps[sub] = name
+        out = "out = %s" % _tuple(_tuple(self._render(n, temps) for n in row) for row in nodes)
+        preds = ["%s = (%s %s %r).tolist()" % (name, field, op, value)
+                 for (field, op, value), name in sorted(self._preds.items(), key=lambda kv: int(kv[1][2:]))]
+        self.source = "\n".join(preds + lines + [out])
+        self._code = compile(self.source, "<models:%s>" % ",".join(self.models), "exec")
+
+    def _render(self, node, temps):
+        if node is True or node is False:
+            return str(node)
+        if node in temps:
+            return temps[node]
+        if isinstance(node, Cmp):
+            if isinstance(node.value, Ref):
+                return "(%s[%s] %s %s[%s])" % (node.field, node.sample, node.op,
+                                               node.value.field, node.value.sample)
+            key = (node.field, node.op, node.value)
+            name = self._preds.setdefault(key, "_p%d" % len(self._preds))
+            return "%s[%s]" % (name, node.sample)
+        if isinstance(node, (And, Or)):
+            joiner = " and " if isinstance(node, And) else " or "
+            return "(%s)" % joiner.join(self._render(a, temps) for a in node.args)
+        if isinstance(node, Not):
+            return "(not %s)" % self._render(node.args[0], temps)
+        return "(%s)" % node.args[0]
+
+    def __call__(self, gt_types, **arrays):
+        arrays['gt_types'] = gt_types
+        exec(self._code, arrays)
+        return np.array(arrays['out'], dtype=bool)
@@ -0,0 +1,432 @@
+"""
+A pedigree stored as arrays, one entry per sample, for cohorts too large
+to hold a Sample object per person. Samples are grouped by family so each
+family is a contiguous run of rows; `mom` and `dad` are the rows of the
+parents (-1 for none) and `index` is the column of each sample in the VCF
+(Sample._i). Sex and phenotype use the PED codes (0: unknown, 1: male or
+unaffected, 2: female or affected).
+
+A FamilyView gives the same role index arrays as Family.index without
+making any objects; Family.from_pedigree makes Family objects when the
+filters for a model are needed. read_ped loads a (large) PED file in
+chunks, splitting and checking each chunk with numpy, and reports every
+problem in the file at once. cached_read_ped keeps what read_ped makes in
+a cache directory from which it's loaded memory-mapped.
+
+>>> ped = Pedigree.from_columns(['f1', 'f1', 'f1', 'f2'],
+...                             ['dad', 'mom', 'kid', 'kid2'],
+...                             ['0', '0', 'dad', '0'],
+...                             ['0', '0', 'mom', '0'],
+...                             ['1', '2', '1', '2'],
+...                             ['1', '1', '2', '2'])
+>>> len(ped), ped.family_ids
+(4, ['f1', 'f2'])
+>>> ped.mom.tolist(), ped.dad.tolist()
+([-1, -1, 1, -1], [-1, -1, 0, -1])
+>>> ped['f1'].index('affecteds_with_parent')
+array([2])
+>>> from inheritance import Family
+>>> Family.from_pedigree(ped)['f1'].affecteds
+[Sample(kid;affected;male)]
+"""
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .inheritance import fix_sample_name, basestring, unicode
+
+UNKNOWN = 0
+MALE, FEMALE = 1, 2
+UNAFFECTED, AFFECTED = 1, 2
+
+_sex_codes = {'1': MALE, '2': FEMALE, 'male': MALE, 'female': FEMALE}
+_phenotype_codes = {'1': UNAFFECTED, '2': AFFECTED}
+_affected_codes = {True: AFFECTED, False: UNAFFECTED, None: UNKNOWN}
+
+roles = ('subjects', 'males', 'females', 'affecteds', 'affecteds_with_parent',
+         'samples_with_parent', 'unaffecteds', 'unknown')
+
+
+# the characters str.split() splits on that are 1 byte in utf-8.
+_whitespace = np.array([ord(c) for c in " \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"], dtype=np.uint8)
+
+
+class PedError(ValueError):
+    """the problems found in a PED file. `errors` has 1 message for each."""
+
+    def __init__(self, errors, shown=20):
+        self.errors = list(errors)
+        msg = "%d problem(s) in the pedigree:\n%s" % (len(self.errors), "\n".join(self.errors[:shown]))
+        if len(self.errors) > shown:
+            msg += "\n... and %d more" % (len(self.errors) - shown)
+        ValueError.__init__(self, msg)
+
+
+def _mask(role, mom, dad, sex, affected):
+    if role == 'subjects':
+        return np.ones(len(mom), dtype=bool)
+    if role == 'males':
+        return sex == MALE
+    if role == 'females':
+        return sex == FEMALE
+    if role == 'affecteds':
+        return affected == AFFECTED
+    if role == 'unaffecteds':
+        return affected == UNAFFECTED
+    if role == 'unknown':
+        return affected == UNKNOWN
+    with_parent = (mom >= 0) & (dad >= 0)
+    if role == 'samples_with_parent':
+        return with_parent
+    if role == 'affecteds_with_parent':
+        return with_parent & (affected == AFFECTED)
+    raise KeyError(role)
+
+
+def _codes(values, lookup):
+    """the code of each string in `values`; UNKNOWN if it isn't in lookup."""
+    values = np.asarray(values, dtype=str)
+    codes = np.zeros(len(values), dtype=np.int8)
+    for v, code in lookup.items():
+        codes[values == v] = code
+    return codes
+
+
+def _fix_names(values):
+    """fix_sample_name for an array of strings."""
+    if len(values) == 0:
+        return values
+    return np.char.replace(np.char.replace(values, "-", "_"), " ", "_")
+
+
+def _first_seen(values):
+    """unique values in the order first seen and the code of each value."""
+    uniq, first, codes = np.unique(values, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+    return uniq[order], rank[codes.ravel()]
+
+
+class Pedigree(object):
+    """
+    arrays for the samples of a cohort, sorted by family (in the order the
+    families were first seen) and then by index. `starts[k]` to
+    `starts[k + 1]` are the rows of family k.
+    """
+
+    def __init__(self, family_ids, starts, sample_ids, index, mom, dad, sex, affected):
+        self.family_ids = list(family_ids)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.sample_ids = np.asarray(sample_ids)
+        self.index = np.asarray(index, dtype=np.int64)
+        self.mom = np.asarray(mom, dtype=np.int32)
+        self.dad = np.asarray(dad, dtype=np.int32)
+        self.sex = np.asarray(sex, dtype=np.int8)
+        self.affected = np.asarray(affected, dtype=np.int8)
+        self._positions = None
+
+    @classmethod
+    def from_columns(klass, family_ids, sample_ids, paternal_ids, maternal_ids, sex, phenotype,
+                     order=None):
+        """
+        make a Pedigree from the columns of a PED file. Sample names are
+        fixed as in Family.from_ped. `order` maps sample ids to their VCF
+        column; without it samples are numbered in the order given. A
+        parent that isn't a sample in the same family is taken as missing.
+        """
+        sample_ids, paternal_ids, maternal_ids = (_fix_names(np.asarray(c, dtype=str))
+                                                  for c in (sample_ids, paternal_ids, maternal_ids))
+        if order is not None:
+            order = dict((fix_sample_name(k), v) for k, v in order.items())
+        return klass._from_fixed(family_ids, sample_ids, paternal_ids, maternal_ids, sex, phenotype,
+                                 order)
+
+    @classmethod
+    def _from_fixed(klass, family_ids, sample_ids, paternal_ids, maternal_ids, sex, phenotype, order):
+        # as from_columns for sample names (and order) that are already fixed.
+        family_ids = np.asarray(family_ids, dtype=str)
+        n = len(family_ids)
+        if n == 0:
+            return klass([], [0], [], [], [], [], [], [])
+        if order is None:
+            index = np.arange(n, dtype=np.int64)
+        else:
+            index = np.array([order[s] for s in sample_ids.tolist()], dtype=np.int64)
+
+        # group by family and, as Family.from_ped, order each by index.
+        uniq, fam = _first_seen(family_ids)
+        rows = np.lexsort((index, fam))
+        fam, family_ids, index = fam[rows], family_ids[rows], index[rows]
+        sample_ids, paternal_ids, maternal_ids = sample_ids[rows], paternal_ids[rows], maternal_ids[rows]
+
+        # find parents by (family, sample id) with a binary search.
+        keys = np.char.add(np.char.add(family_ids, '\t'), sample_ids)
+        by_key = np.argsort(keys, kind='stable')
+        sorted_keys = keys[by_key]
+
+        def find(parent_ids):
+            wanted = np.char.add(np.char.add(family_ids, '\t'), parent_ids)
+            at = np.minimum(np.searchsorted(sorted_keys, wanted), n - 1)
+            return np.where(sorted_keys[at] == wanted, by_key[at], -1)
+
+        starts = np.searchsorted(fam, np.arange(len(uniq) + 1))
+        return klass(uniq.tolist(), starts, sample_ids, index, find(maternal_ids), find(paternal_ids),
+                     _codes(np.asarray(sex, dtype=str)[rows], _sex_codes),
+                     _codes(np.asarray(phenotype, dtype=str)[rows], _phenotype_codes))
+
+    @classmethod
+    def from_families(klass, families):
+        """make a Pedigree from Family objects (or a dict of them)."""
+        if isinstance(families, dict):
+            families = list(families.values())
+        family_ids, starts, sample_ids, index, mom, dad, sex, affected = [], [0], [], [], [], [], [], []
+        for f in families:
+            rows = dict((id(s), starts[-1] + k) for k, s in enumerate(f.subjects))
+            family_ids.append(f.family_id)
+            for s in f.subjects:
+                sample_ids.append(s.sample_id)
+                index.append(s._i)
+                mom.append(rows.get(id(s.mom), -1))
+                dad.append(rows.get(id(s.dad), -1))
+                sex.append(_sex_codes.get(s.sex and str(s.sex), UNKNOWN))
+                affected.append(_affected_codes[s.affected])
+            starts.append(len(sample_ids))
+        return klass(family_ids, starts, sample_ids, index, mom, dad, sex, affected)
+
+    _arrays = ('family_ids', 'starts', 'sample_ids', 'index', 'mom', 'dad', 'sex', 'affected')
+
+    def save(self, path):
+        """write the arrays as .npy files to the directory `path`."""
+        if not os.path.exists(path):
+            os.makedirs(path)
+        for name in self._arrays:
+            a = getattr(self, name)
+            np.save(os.path.join(path, name + ".npy"), np.asarray(a, dtype=str) if name == 'family_ids' else a)
+
+    @classmethod
+    def load(klass, path, mmap_mode='r'):
+        """read a Pedigree written by save, memory-mapping the arrays."""
+        a = dict((name, np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap_mode))
+                 for name in klass._arrays)
+        a['family_ids'] = a['family_ids'].tolist()
+        return klass(**a)
+
+    def __len__(self):
+        return len(self.sample_ids)
+
+    @property
+    def nbytes(self):
+        """bytes used by the arrays."""
+        return sum(a.nbytes for a in (self.starts, self.sample_ids, self.index, self.mom,
+                                      self.dad, self.sex, self.affected))
+
+    def mask(self, role):
+        """a boolean array over all samples for one of `roles`."""
+        return _mask(role, self.mom, self.dad, self.sex, self.affected)
+
+    def __getitem__(self, family_id):
+        if self._positions is None:
+            self._positions = dict((f, k) for k, f in enumerate(self.family_ids))
+        return FamilyView(self, self._positions[family_id])
+
+    def __iter__(self):
+        for k in range(len(self.family_ids)):
+            yield FamilyView(self, k)
+
+
+class FamilyView(object):
+    """
+    the rows of 1 family in a Pedigree. `index` matches Family.index for the
+    same family.
+    """
+
+    __slots__ = ('pedigree', 'k', 'start', 'stop')
+
+    def __init__(self, pedigree, k):
+        self.pedigree, self.k = pedigree, k
+        self.start, self.stop = int(pedigree.starts[k]), int(pedigree.starts[k + 1])
+
+    @property
+    def family_id(self):
+        return self.pedigree.family_ids[self.k]
+
+    def __len__(self):
+        return self.stop - self.start
+
+    @property
+    def sample_ids(self):
+        return self.pedigree.sample_ids[self.start:self.stop].tolist()
+
+    def index(self, role='subjects'):
+        """the VCF columns (Sample._i) of the samples in `role`, or of each
+        sample's parents (-1 for none) for 'moms' and 'dads'."""
+        p, rows = self.pedigree, slice(self.start, self.stop)
+        if role in ('moms', 'dads'):
+            parents = (p.mom if role == 'moms' else p.dad)[rows]
+            return np.where(parents >= 0, p.index[np.maximum(parents, 0)], -1)
+        if role == 'subjects':
+            return p.index[rows]
+        return p.index[rows][_mask(role, p.mom[rows], p.dad[rows], p.sex[rows], p.affected[rows])]
+
+    def __repr__(self):
+        return "FamilyView(%s, %d samples)" % (self.family_id, len(self))
+
+
+def _split_lines(text, n_lines):
+    """
+    the tokens of `text` (n_lines lines, each ending in a newline) and the
+    number of tokens and whether it's a comment for each line, found for
+    all lines at once.
+    """
+    tokens = text.split()
+    b = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+    space = np.isin(b, _whitespace)
+    # a token starts at a non-space that follows a space or the start.
+    starts = ~space
+    starts[1:] &= space[:-1]
+    newline = b == 10
+    line = np.cumsum(newline) - newline
+    counts = np.bincount(line[starts], minlength=n_lines)
+    line_starts = np.concatenate(([0], np.flatnonzero(newline)[:-1] + 1))
+    comment = b[line_starts] == ord("#")
+    if counts.sum() != len(tokens):
+        # other (unicode) whitespace; split each line instead.
+        counts = np.array([len(l.split()) for l in text.split("\n")[:n_lines]], dtype=np.int64)
+    return tokens, counts, comment
+
+
+def _open(ped):
+    if isinstance(ped, basestring) and os.path.exists(ped):
+        return open(ped)
+    if isinstance(ped, basestring):
+        return io.StringIO(unicode(ped))
+    return ped
+
+
+def read_ped(ped, order=None, chunk_size=1 << 22):
+    """
+    read a PED file (a path, its text or an open file) into a Pedigree, as
+    Family.from_ped but reading about `chunk_size` bytes at a time. Lines
+    starting with # and blank lines are skipped and only the first 6
+    columns are used. Raises a PedError that lists every line with too few
+    columns, a sample repeated in its family, a sample that's its own
+    parent or, with `order`, a sample that isn't in the VCF.
+
+    >>> try:
+    ...     read_ped("f1 kid 0 0 1 2\\nf1 kid 0 0 1 1\\nf1 x\\n")
+    ... except PedError as e:
+    ...     print(e)
+    2 problem(s) in the pedigree:
+    line 2: sample kid is repeated in family f1 (first on line 1)
+    line 3: expected at least 6 columns, found 2
+    """
+    fh = _open(ped)
+    columns, numbers, errors = [], [], []
+    n_read = 0
+    try:
+        while True:
+            lines = fh.readlines(chunk_size)
+            if not lines:
+                break
+            if not lines[-1].endswith("\n"):
+                lines[-1] += "\n"
+            tokens, counts, comment = _split_lines("".join(lines), len(lines))
+            line_numbers = np.arange(n_read + 1, n_read + len(lines) + 1)
+            n_read += len(lines)
+
+            used = ~comment & (counts > 0)
+            short = used & (counts < 6)
+            for n, c in zip(line_numbers[short].tolist(), counts[short].tolist()):
+                errors.append((n, "line %d: expected at least 6 columns, found %d" % (n, c)))
+            ok = used & ~short
+            first = (np.cumsum(counts) - counts)[ok]
+            tokens = np.array(tokens, dtype=object)
+            columns.append(tokens[first[:, None] + np.arange(6)].astype(str))
+            numbers.append(line_numbers[ok])
+    finally:
+        if fh is not ped:
+            fh.close()
+
+    rows = np.concatenate(columns) if columns else np.zeros((0, 6), dtype=str)
+    numbers = np.concatenate(numbers) if numbers else np.zeros(0, dtype=np.int64)
+    family_ids, sample_ids, paternal_ids, maternal_ids, sex, phenotype = rows.T
+    sample_ids, paternal_ids, maternal_ids = (_fix_names(c) for c in (sample_ids, paternal_ids, maternal_ids))
+
+    keys = np.char.add(np.char.add(family_ids, "\t"), sample_ids)
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    first = first[inverse.ravel()]
+    for k in np.flatnonzero(first != np.arange(len(keys))).tolist():
+        errors.append((numbers[k], "line %d: sample %s is repeated in family %s (first on line %d)" % (
+            numbers[k], sample_ids[k], family_ids[k], numbers[first[k]])))
+    for k in np.flatnonzero((paternal_ids == sample_ids) | (maternal_ids == sample_ids)).tolist():
+        errors.append((numbers[k], "line %d: sample %s is its own parent" % (numbers[k], sample_ids[k])))
+    if order is not None:
+        order = dict((fix_sample_name(k), v) for k, v in order.items())
+        known = np.isin(sample_ids, np.array(list(order), dtype=str))
+        for k in np.flatnonzero(~known).tolist():
+            errors.append((numbers[k], "line %d: sample %s is not in the VCF" % (numbers[k], sample_ids[k])))
+    if errors:
+        raise PedError([e for _, e in sorted(errors, key=lambda e: e[0])])
+
+    return Pedigree._from_fixed(family_ids, sample_ids, paternal_ids, maternal_ids, sex, phenotype,
+                                order)
+
+
+# part of the cache key; change it when the saved arrays change.
+_cache_version = "1"
+
+
+def cache_key(ped, samples):
+    """
+    a hash of the contents of the PED file (path or text) `ped`, the VCF
+    `samples` (in order) and the cache version.
+    """
+    h = hashlib.sha1(_cache_version.encode())
+    if isinstance(ped, basestring) and os.path.exists(ped):
+        with open(ped, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                h.update(block)
+    else:
+        h.update(ped.encode("utf-8"))
+    h.update(b"\0")
+    h.update("\t".join(samples).encode("utf-8"))
+    return h.hexdigest()
+
+
+def cached_read_ped(ped, samples, cache_dir, chunk_size=1 << 22):
+    """
+    read_ped(ped, order=...) for the VCF `samples`, using the copy saved in
+    `cache_dir` if the PED and samples are the same as when it was saved.
+    Otherwise the PED is read and saved there. A copy made by another
+    process at the same time is kept.
+    """
+    if not isinstance(ped, basestring):
+        ped = ped.read()
+    path = os.path.join(cache_dir, "pedigree-" + cache_key(ped, samples))
+    if os.path.exists(path):
+        return Pedigree.load(path)
+    pedigree = read_ped(ped, order=dict((s, i) for i, s in enumerate(samples)),
+                        chunk_size=chunk_size)
+    if not os.path.exists(cache_dir):
+        try:
+            os.makedirs(cache_dir)
+        except OSError:
+            # made by another process.
+            pass
+    # save to a temporary directory and rename it so no process sees a partial copy.
+    tmp = tempfile.mkdtemp(dir=cache_dir, prefix=".pedigree-")
+    try:
+        pedigree.save(tmp)
+        os.rename(tmp, path)
+    except OSError:
+        if not os.path.exists(path):
+            raise
+    finally:
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+    return Pedigree.load(path)
@@ -0,0 +1,121 @@
+"""
+Phase kids by transmission for a block of variants at once, as
+Family.famphase does for 1 variant, using the allele indices of each call
+(as cyvcf2's genotype.array() gives) rather than genotype strings.
+
+A HET kid with both parents called is phased when there's exactly 1 way
+for it to have got 1 of its alleles from its mom and the other from its
+dad. The phased kid's alleles are ordered mom|dad. For biallelic sites
+this is what famphase does; it also phases multi-allelic sites such as
+mom 0/1 x dad 0/2 -> kid 1/2.
+
+>>> alleles = np.array([[[0, 0], [0, 1], [1, 0]],    # mom 0/0, dad 0/1, kid 1/0
+...                     [[0, 1], [0, 1], [0, 1]]])   # all het: can't phase
+>>> phased, phases = phase(alleles, [2], [0], [1])
+>>> phased[:, 2].tolist(), phases[:, 2].tolist()
+([[0, 1], [0, 1]], [True, False])
+"""
+import numpy as np
+
+from .pedigree import Pedigree
+
+HOM_REF, HET, HOM_ALT = 0, 1, 3
+
+
+def trios(families):
+    """
+    the (kids, moms, dads) arrays of Sample._i for the samples with both
+    parents in a Family, a dict or list of families or a
+    inheritance.pedigree.Pedigree.
+    """
+    if isinstance(families, Pedigree):
+        p = families
+        rows = np.flatnonzero((p.mom >= 0) & (p.dad >= 0))
+        return p.index[rows], p.index[p.mom[rows]], p.index[p.dad[rows]]
+    if isinstance(families, dict):
+        families = list(families.values())
+    elif not isinstance(families, (list, tuple)):
+        families = [families]
+    kids, moms, dads = [], [], []
+    for f in families:
+        moms_i, dads_i = f.index('moms'), f.index('dads')
+        keep = (moms_i >= 0) & (dads_i >= 0)
+        kids.append(f.index()[keep])
+        moms.append(moms_i[keep])
+        dads.append(dads_i[keep])
+    if not kids:
+        return tuple(np.zeros(0, dtype=np.int64) for _ in range(3))
+    return np.concatenate(kids), np.concatenate(moms), np.concatenate(dads)
+
+
+def genotype_types(a0, a1):
+    """gt_types (HOM_REF, HET, HOM_ALT) from the 2 allele indices of calls."""
+    return np.where(a0 != a1, HET, np.where(a0 == 0, HOM_REF, HOM_ALT))
+
+
+def phase(alleles, kids, moms, dads, phases=None):
+    """
+    phase the `kids` (columns, with their `moms` and `dads`) in `alleles`,
+    an int array of (variants, samples, 2) allele indices where a negative
+    value is a missing allele. `phases` is an optional (variants, samples)
+    bool array of the phase of each call as read.
+
+    returns copies of alleles, with the alleles of phased kids ordered
+    mom|dad, and of phases, True for phased kids. Kids with apparent de
+    novo or mendelian errors (no way to get an allele from each parent)
+    are left as they are.
+    """
+    alleles = np.array(alleles, copy=True)
+    if phases is None:
+        phases = np.zeros(alleles.shape[:2], dtype=bool)
+    else:
+        phases = np.array(phases, dtype=bool, copy=True)
+    kids, moms, dads = (np.asarray(x, dtype=np.int64) for x in (kids, moms, dads))
+    if len(kids) == 0:
+        return alleles, phases
+
+    # (variants, trios) for each allele of each member.
+    k0, k1 = alleles[:, kids, 0], alleles[:, kids, 1]
+    m0, m1 = alleles[:, moms, 0], alleles[:, moms, 1]
+    d0, d1 = alleles[:, dads, 0], alleles[:, dads, 1]
+
+    called = (k0 >= 0) & (k1 >= 0) & (m0 >= 0) & (m1 >= 0) & (d0 >= 0) & (d1 >= 0)
+
+    def has(a, b0, b1):
+        return (a == b0) | (a == b1)
+
+    # k0 from mom and k1 from dad, or k1 from mom and k0 from dad.
+    as_is = has(k0, m0, m1) & has(k1, d0, d1)
+    swapped = has(k1, m0, m1) & has(k0, d0, d1)
+    ok = called & (k0 != k1) & (as_is != swapped)
+    mom_allele = np.where(as_is, k0, k1)
+    dad_allele = np.where(as_is, k1, k0)
+
+    v, t = np.nonzero(ok)
+    alleles[v, kids[t], 0] = mom_allele[v, t]
+    alleles[v, kids[t], 1] = dad_allele[v, t]
+    phases[v, kids[t]] = True
+    return alleles, phases
+
+
+def genotype_arrays(variants):
+    """
+    the (variants, samples, 2) allele indices and (variants, samples) phases
+    of cyvcf2 variants. Haploid calls get a missing (-1) 2nd allele and
+    calls with more than 2 alleles are missing so neither is phased.
+    """
+    variants = list(variants)
+    if not variants:
+        return np.zeros((0, 0, 2), dtype=np.int16), np.zeros((0, 0), dtype=bool)
+    n_samples = len(variants[0].genotype.array())
+    alleles = np.full((len(variants), n_samples, 2), -1, dtype=np.int16)
+    phases = np.zeros((len(variants), n_samples), dtype=bool)
+    for i, v in enumerate(variants):
+        # the alleles then the phase of each call, as wide as the most alleles.
+        a = v.genotype.array()
+        ploidy = a.shape[1] - 1
+        alleles[i, :, :min(ploidy, 2)] = a[:, :min(ploidy, 2)]
+        if ploidy > 2:
+            alleles[i][(a[:, 2:ploidy] >= 0).any(axis=1)] = -1
+        phases[i] = a[:, -1] != 0
+    return alleles, phases
@@ -0,0 +1,212 @@
+"""
+Cheap checks that reject records before the inheritance models are
+evaluated, with counts of the records removed by each.
+
+Checks of FILTER and INFO (e.g. FILTER=PASS, AC, AF, a population frequency)
+are chosen by the user. The carrier check comes from the models: when no
+family can match a model unless 1 of its affecteds has an alt allele (true
+of auto_dom, auto_rec, de_novo, comp_het, ...), a record where no affected
+has an alt allele is skipped without evaluating any family.
+"""
+from __future__ import print_function
+
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+from . import pyeval
+from .pyeval import simplified
+from .expr import Cmp, Ref, as_node, assume
+
+
+def _column(s):
+    return s._i + 1
+
+
+def needs_carrier(flt, samples, HET=1, HOM_ALT=3):
+    """
+    True if `flt` can't pass unless 1 of `samples` (as used in the filter;
+    Sample._i for a family from from_family(..., sample_id=_column)) is HET
+    or HOM_ALT.
+
+    >>> mom, dad, kid = pyeval.Sample('mom', False), pyeval.Sample('dad', False), pyeval.Sample('kid', True)
+    >>> kid.mom, kid.dad = mom, dad
+    >>> f = pyeval.Family([mom, dad, kid], 'trio')
+    >>> needs_carrier(f.de_novo(), ['kid']), needs_carrier(f.de_novo(), ['mom'])
+    (True, False)
+    """
+    samples = set(samples)
+
+    def known(c):
+        # comparisons for a sample that is HOM_REF or UNKNOWN.
+        if c.field != 'gt_types' or c.sample not in samples or isinstance(c.value, Ref):
+            return None
+        if c.value in (HET, HOM_ALT):
+            return c.op == '!='
+        return None
+
+    return assume(as_node(simplified(flt)), known) is False
+
+
+def _feasible(family, models, args, kwargs):
+    return any(family.plan(model, *args, **kwargs).feasible for model in models)
+
+
+def _needs_carriers(family, models, args, kwargs):
+    copy = pyeval.Family.from_family(family, sample_id=_column)
+    affected = [s._i for s in family.affecteds]
+    return all(needs_carrier(getattr(copy, model)(*args, **kwargs), affected)
+               for model in models)
+
+
+def carrier_columns(families, models, *args, **kwargs):
+    """
+    the sorted VCF columns (Sample._i) of the affecteds of `families` if
+    every model can only match a family when 1 of its affecteds has an alt
+    allele. Otherwise None.
+    """
+    if isinstance(families, dict):
+        families = list(families.values())
+    columns = set()
+    for f in families:
+        if not _feasible(f, models, args, kwargs):
+            continue
+        if not _needs_carriers(f, models, args, kwargs):
+            return None
+        columns.update(f.index('affecteds').tolist())
+    return np.array(sorted(columns), dtype=np.int64)
+
+
+class Carriers(object):
+    """
+    find the families that can match `models` at a variant. A family that
+    can only match when 1 of its affecteds has an alt allele is skipped if
+    none does; the number of affecteds with an alt allele in each family is
+    found for all families at once with np.add.reduceat over the columns of
+    their affecteds.
+
+    >>> fams = pyeval.Family.from_ped('''
+    ... f1 dad 0 0 1 1
+    ... f1 mom 0 0 2 1
+    ... f1 kid dad mom 1 2
+    ... f2 kid2 0 0 1 2'''.strip())
+    >>> carriers = Carriers(fams, ['auto_rec'])
+    >>> carriers.counts(np.array([1, 0, 1, 0]))
+    array([1, 0])
+    >>> carriers(np.array([1, 0, 1, 0]))
+    array([ True, False])
+    """
+
+    def __init__(self, families, models, *args, **kwargs):
+        if isinstance(families, dict):
+            families = list(families.values())
+        # families that always have to be evaluated.
+        self.always = np.zeros(len(families), dtype=bool)
+        checked, columns, starts = [], [], []
+        for k, f in enumerate(families):
+            # families that can't match any model are never evaluated.
+            if not _feasible(f, models, args, kwargs):
+                continue
+            if not _needs_carriers(f, models, args, kwargs):
+                self.always[k] = True
+                continue
+            affected = np.sort(f.index('affecteds'))
+            if not len(affected):
+                continue
+            checked.append(k)
+            starts.append(len(columns))
+            columns.extend(affected)
+        self.checked = np.array(checked, dtype=np.int64)
+        self.columns = np.array(columns, dtype=np.int64)
+        self.starts = np.array(starts, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.always)
+
+    def counts(self, gt_types):
+        """the number of affecteds with an alt allele in each checked family."""
+        if len(self.starts) == 0:
+            return np.zeros(0, dtype=np.int64)
+        g = gt_types[self.columns]
+        return np.add.reduceat(((g == 1) | (g == 3)).astype(np.int64), self.starts)
+
+    def __call__(self, gt_types):
+        """a boolean vector of the families to evaluate at a variant."""
+        keep = self.always.copy()
+        keep[self.checked] = self.counts(gt_types) > 0
+        return keep
+
+
+def _at_most(field, limit):
+    def check(variant):
+        v = variant.INFO.get(field)
+        if v is None:
+            return True
+        # for multiple alts, keep the record if any is under the limit.
+        if isinstance(v, tuple):
+            v = min(v)
+        return v <= limit
+    return check
+
+
+class Prefilter(object):
+    """
+    `sites` filters records on FILTER and INFO and `carrier` checks a record
+    for an affected with an alt allele. `counts` has the number of records
+    removed by each check.
+    """
+
+    def __init__(self, pass_only=False, max_ac=None, max_af=None,
+                 popfreq_field=None, max_popfreq=None, carriers=None):
+        self.checks = []
+        if pass_only:
+            # cyvcf2 gives None for PASS or '.'
+            self.checks.append(("FILTER", lambda v: v.FILTER is None))
+        if max_ac is not None:
+            self.checks.append(("AC", _at_most("AC", max_ac)))
+        if max_af is not None:
+            self.checks.append(("AF", _at_most("AF", max_af)))
+        if popfreq_field is not None and max_popfreq is not None:
+            self.checks.append((popfreq_field, _at_most(popfreq_field, max_popfreq)))
+        self.carriers = carriers
+        self.seen = 0
+        self.counts = OrderedDict((name, 0) for name, _ in self.checks)
+        if carriers is not None:
+            self.counts["no affected carrier"] = 0
+
+    def __bool__(self):
+        return bool(self.counts)
+    __nonzero__ = __bool__
+
+    def sites(self, variants):
+        """yield the records that pass the FILTER and INFO checks."""
+        checks, counts = self.checks, self.counts
+        for v in variants:
+            self.seen += 1
+            for name, check in checks:
+                if not check(v):
+                    counts[name] += 1
+                    break
+            else:
+                yield v
+
+    def carrier(self, variant):
+        """False if no affected has an alt allele at this record."""
+        if self.carriers is None:
+            return True
+        g = variant.gt_types[self.carriers]
+        if ((g == 1) | (g == 3)).any():
+            return True
+        self.counts["no affected carrier"] += 1
+        return False
+
+    def update(self, seen, counts):
+        """add the counts from another Prefilter (e.g. from a worker)."""
+        self.seen += seen
+        for k, v in counts.items():
+            self.counts[k] += v
+
+    def report(self, fh=None):
+        print("prefilter: %d records. removed: %s" % (self.seen,
+              ", ".join("%s=%d" % kv for kv in self.counts.items())), file=fh or sys.stderr)
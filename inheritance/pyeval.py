@@ -141,6 +141,7 @@ except NameError:
     from functools import reduce
 
 from .inheritance import make_classes
+from .expr import Ref, Cmp, And, Or, Not, as_node, simplify
 
 
 valid_gts = (
@@ -173,29 +174,34 @@ class Filter(object):
     def in_(self, li):
         return reduce(op.or_, [self == i for i in li])
 
+    def _cmp(self, cmp, o):
+        if isinstance(o, Filter):
+            o = Ref(o.gt_field, o.sample0)
+        return self.expr.render(Cmp(self.gt_field, self.sample0, cmp, o))
+
     def __lt__(self, o):
-        return ostr("%s[%s] < %s" % (self.gt_field, self.sample0, o))
+        return self._cmp("<", o)
 
     def __le__(self, o):
-        return ostr("%s[%s] <= %s" % (self.gt_field, self.sample0, o))
+        return self._cmp("<=", o)
 
     def __gt__(self, o):
-        return ostr("%s[%s] > %s" % (self.gt_field, self.sample0, o))
+        return self._cmp(">", o)
 
     def __ge__(self, o):
-        return ostr("%s[%s] >= %s" % (self.gt_field, self.sample0, o))
+        return self._cmp(">=", o)
 
     def __eq__(self, o):
-        return ostr("%s[%s] == %s" % (self.gt_field, self.sample0, o))
+        return self._cmp("==", o)
 
     def __ne__(self, o):
-        return ostr("%s[%s] != %s" % (self.gt_field, self.sample0, o))
+        return self._cmp("!=", o)
 
     def __str__(self):
-        return ostr("%s[%s]" % (self.gt_field, self.sample0))
+        return self.expr.render(Ref(self.gt_field, self.sample0))
 
     def __repr__(self):
-        return ostr("%s[%s]" % (self.gt_field, self.sample0))
+        return self.expr.render(Ref(self.gt_field, self.sample0))
 
     def __and__(self, other):
         raise Exception("shouldn't be here. wrap &/| statements in parens")
@@ -216,22 +222,90 @@ def _bracket(other):
     return "(%s)" % o
 
 class ostr(str):
+    """
+    A filter expression. The string is the expression to eval and `node` is
+    its structure (see expr.py) which is used to simplify it.
+    """
+    # how the value for a single sample is pulled from a gt_field array and
+    # the tokens used to join expressions.
+    index = "%s[%s]"
+    and_, or_, not_ = " and ", " or ", "not "
+
+    node = None
+
+    @classmethod
+    def make(klass, s, node):
+        e = klass(s)
+        e.node = node
+        return e
+
+    @classmethod
+    def render(klass, node, temps=None):
+        """
+        the expression for `node`. `temps` maps sub-expressions to the names
+        of variables that already hold their values.
+        """
+        if node is True or node is False:
+            return str(node)
+        if temps and node in temps:
+            return klass.make(temps[node], node)
+        if isinstance(node, Ref):
+            s = klass.index % node.args
+        elif isinstance(node, Cmp):
+            value = node.value
+            if isinstance(value, Ref):
+                value = klass.index % value.args
+            s = "%s %s %s" % (klass.index % (node.field, node.sample), node.op, value)
+        elif isinstance(node, (And, Or)):
+            joiner = klass.and_ if isinstance(node, And) else klass.or_
+            s = joiner.join(_bracket(klass.render(a, temps)) for a in node.args)
+        elif isinstance(node, Not):
+            s = klass.not_ + _bracket(klass.render(node.args[0], temps))
+        else:
+            s = node.args[0]
+        return klass.make(s, node)
+
+    def simplify(self):
+        """
+        return an equivalent expression with nested and/or flattened,
+        constants folded and repeated operands removed.
+        """
+        return self.render(simplify(as_node(self)))
+
     def __and__(self, other):
         if other is None: return self
         if other is True: return self
         if other is False: return self
-        return ostr("%s and %s" % (_bracket(self), _bracket(other)))
+        return self.make(_bracket(self) + self.and_ + _bracket(other),
+                         And(as_node(self), as_node(other)))
 
     def __or__(self, other):
         if other is None: return self
         if other is True: return True
         if other is False: return False
-        return ostr("%s or %s" % (_bracket(self), _bracket(other)))
+        return self.make(_bracket(self) + self.or_ + _bracket(other),
+                         Or(as_node(self), as_node(other)))
 
     def __invert__(self):
-        return ostr("not %s" % _bracket(self))
+        return self.make(self.not_ + _bracket(self), Not(as_node(self)))
 
     def __nonzero__(self):
         raise Exception("shouldn't be here. use & instead of 'and'. and wrap in parens")
 
+Filter.expr = ostr
+
+
+def simplified(flt):
+    """
+    simplify the result of a model. False, None and constant strings become
+    'False' or 'True'.
+    """
+    if flt is False or flt is None:
+        return 'False'
+    if flt is True:
+        return 'True'
+    if isinstance(flt, ostr):
+        return flt.simplify()
+    return flt
+
 Sample, Family = make_classes(valid_gts, Filter, *range(4))
@@ -0,0 +1,89 @@
+"""
+Regions to limit the CLI to, from a BED file or from gene names looked up in
+a BED file of gene intervals (chrom, start, end, gene name).
+
+Intervals use 1-based inclusive coordinates like VCF and region queries.
+
+>>> regions = merge([('2', 1, 100), ('1', 500, 600), ('1', 550, 700), ('1', 800, 900)], ['1', '2'])
+>>> for r in regions: print(r)
+('1', 500, 700, 0)
+('1', 800, 900, 701)
+('2', 1, 100, 0)
+"""
+from __future__ import print_function
+
+import gzip
+import sys
+
+
+def _open(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt")
+    return open(path)
+
+
+def read_bed(path, names=None):
+    """
+    yield (chrom, start, end) for each interval in a BED file. If `names` is
+    given, only the intervals whose 4th column is one of them are used and
+    (chrom, start, end, name) is yielded.
+    """
+    with _open(path) as fh:
+        for line in fh:
+            if line.startswith(("#", "track", "browser")) or not line.strip():
+                continue
+            toks = line.rstrip("\r\n").split("\t")
+            start, end = int(toks[1]) + 1, int(toks[2])
+            if names is None:
+                yield toks[0], start, end
+            elif len(toks) > 3 and toks[3] in names:
+                yield toks[0], start, end, toks[3]
+
+
+def read_genes(value):
+    """gene names from a file with 1 per line or from a comma-separated list."""
+    try:
+        with _open(value) as fh:
+            return [l.strip() for l in fh if l.strip() and not l.startswith("#")]
+    except (IOError, OSError):
+        return [g for g in value.split(",") if g]
+
+
+def gene_intervals(path, genes):
+    """
+    return the intervals of `genes` from the BED file of gene intervals at
+    `path`. Genes that aren't in the file are reported to stderr.
+    """
+    genes = set(genes)
+    intervals, found = [], set()
+    for chrom, start, end, name in read_bed(path, genes):
+        intervals.append((chrom, start, end))
+        found.add(name)
+    for g in sorted(genes - found):
+        print("gene %s not found in %s" % (g, path), file=sys.stderr)
+    return intervals
+
+
+def merge(intervals, contigs):
+    """
+    sort the intervals in the order of `contigs` (the names in the VCF
+    header) and join those that overlap or touch. Return a list of (chrom,
+    start, end, first) where first is the lowest position of a record to
+    use from the region; a record that starts before it overlaps the
+    previous region and was already used there.
+    """
+    order = dict((c, i) for i, c in enumerate(contigs))
+    missing = sorted(set(i[0] for i in intervals if i[0] not in order))
+    if missing:
+        print("skipping regions on contigs not in the VCF: %s" % ", ".join(missing), file=sys.stderr)
+    intervals = sorted((order[c], s, e, c) for c, s, e in intervals if c in order)
+
+    regions = []
+    for _, start, end, chrom in intervals:
+        if regions and regions[-1][0] == chrom and start <= regions[-1][2] + 1:
+            last = regions[-1]
+            regions[-1] = (chrom, last[1], max(end, last[2]), last[3])
+            continue
+        first = regions[-1][2] + 1 if regions and regions[-1][0] == chrom else 0
+        regions.append((chrom, start, end, first))
+    return regions
@@ -0,0 +1,224 @@
+"""
+Statistics for a CLI run: the time spent in each phase (reading records,
+finding genes, evaluating models and writing), how often each model and
+family was evaluated and passed, the prefilter counts and peak memory. An
+optional sampling profiler counts the lines being run every few
+milliseconds.
+
+Pass a Stats to `inheritance.__main__.run` (or use --stats FILE) and read
+`as_dict()` when it returns.
+
+>>> s = Stats()
+>>> read = list(s.timed(iter([1, 2, 3]), "decode"))
+>>> sorted(s.as_dict()["seconds"])
+['decode', 'evaluate', 'gene', 'total', 'write']
+"""
+from __future__ import print_function
+
+import json
+import resource
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+phases = ("decode", "gene", "evaluate", "write")
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on mac, kilobytes on linux.
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+
+class Stats(object):
+    """
+    collects the statistics of a run. Phases run by different threads (e.g.
+    writing) overlap others so the phase times can add to more than the
+    total. With `profile`, `interval` is the seconds between samples.
+    """
+
+    def __init__(self, profile=False, interval=0.005):
+        self.seconds = OrderedDict((p, 0.0) for p in phases)
+        self.start = time.time()
+        self.total = None
+        self.variants = 0
+        self.models = self.family_ids = None
+        self.evaluated = self.passes = None
+        self.prefilter = None
+        # the largest peak of the worker processes added.
+        self.workers_peak_rss_mb = 0.0
+        self.profiler = Profiler(interval) if profile else None
+
+    def timed(self, iterable, phase):
+        """yield from iterable adding the time spent getting each item to phase."""
+        it = iter(iterable)
+        seconds, t = self.seconds, time.time
+        while True:
+            t0 = t()
+            try:
+                item = next(it)
+            except StopIteration:
+                seconds[phase] += t() - t0
+                return
+            seconds[phase] += t() - t0
+            yield item
+
+    def gene(self, get_gene):
+        """wrap the function that gets the gene of a variant."""
+        seconds, t = self.seconds, time.time
+
+        def timed_gene(variant):
+            t0 = t()
+            try:
+                return get_gene(variant)
+            finally:
+                seconds["gene"] += t() - t0
+        return timed_gene
+
+    def cohort(self, cohort):
+        """wrap a CohortEvaluator or ModelsEvaluator to time and count calls."""
+        self.models = list(cohort.models) if hasattr(cohort, "models") else [cohort.model]
+        self.family_ids = list(cohort.family_ids)
+        self.evaluated = np.zeros(len(self.family_ids), dtype=np.int64)
+        self.passes = np.zeros((len(self.models), len(self.family_ids)), dtype=np.int64)
+        return _Counted(self, cohort)
+
+    def writer(self, writer):
+        """wrap a cyvcf2.Writer to time write_record (from any thread)."""
+        return _TimedWriter(self, writer)
+
+    def add(self, d):
+        """
+        add the statistics (as from as_dict) of another process. The peak
+        memory reported is the largest of any process.
+        """
+        for p, v in d["seconds"].items():
+            if p in self.seconds:
+                self.seconds[p] += v
+        self.variants += d["variants"]
+        self.workers_peak_rss_mb = max(self.workers_peak_rss_mb, d.get("peak_rss_mb", 0.0))
+        if d.get("families") and self.family_ids is not None:
+            index = dict((f, k) for k, f in enumerate(self.family_ids))
+            for f, fd in d["families"].items():
+                k = index[f]
+                self.evaluated[k] += fd["evaluated"]
+                for j, m in enumerate(self.models):
+                    self.passes[j, k] += fd["passes"][m]
+        if self.profiler is not None and d.get("profile"):
+            self.profiler.add(d["profile"])
+
+    def stop(self):
+        if self.total is None:
+            self.total = time.time() - self.start
+        if self.profiler is not None:
+            self.profiler.stop()
+
+    def as_dict(self):
+        seconds = OrderedDict((p, round(v, 4)) for p, v in self.seconds.items())
+        seconds["total"] = round(self.total if self.total is not None else time.time() - self.start, 4)
+        d = OrderedDict([("seconds", seconds), ("variants", self.variants)])
+        if self.models is not None:
+            evaluated = int(self.evaluated.sum())
+            d["models"] = OrderedDict()
+            for j, m in enumerate(self.models):
+                passes = int(self.passes[j].sum())
+                d["models"][m] = OrderedDict([
+                    ("calls", self.variants), ("families_evaluated", evaluated),
+                    ("passes", passes), ("pass_rate", passes / float(evaluated) if evaluated else 0.0)])
+            d["families"] = OrderedDict(
+                (f, OrderedDict([("evaluated", int(self.evaluated[k])),
+                                 ("passes", OrderedDict((m, int(self.passes[j, k]))
+                                                        for j, m in enumerate(self.models)))]))
+                for k, f in enumerate(self.family_ids))
+        if self.prefilter is not None:
+            d["prefilter"] = OrderedDict([("records", self.prefilter.seen),
+                                          ("removed", OrderedDict(self.prefilter.counts))])
+        d["peak_rss_mb"] = round(max(peak_rss_mb(), self.workers_peak_rss_mb), 1)
+        if self.profiler is not None:
+            d["profile"] = self.profiler.top()
+        return d
+
+    def write(self, path):
+        with open(path, "w") as fh:
+            json.dump(self.as_dict(), fh, indent=1)
+            fh.write("\n")
+
+
+class _Counted(object):
+    def __init__(self, stats, cohort):
+        self.stats, self.cohort = stats, cohort
+        self.family_ids = cohort.family_ids
+        self.models = getattr(cohort, "models", None)
+        self.carriers = getattr(cohort, "carriers", None)
+
+    def __call__(self, gt_types, **arrays):
+        stats = self.stats
+        t0 = time.time()
+        res = self.cohort(gt_types, **arrays)
+        stats.seconds["evaluate"] += time.time() - t0
+        stats.variants += 1
+        if self.carriers is None:
+            stats.evaluated += 1
+        else:
+            stats.evaluated += self.carriers(gt_types)
+        stats.passes += res
+        return res
+
+
+class _TimedWriter(object):
+    def __init__(self, stats, writer):
+        self.stats, self.writer = stats, writer
+
+    def write_record(self, variant):
+        # only the writer thread adds to this.
+        t0 = time.time()
+        self.writer.write_record(variant)
+        self.stats.seconds["write"] += time.time() - t0
+
+    def variant_from_string(self, s):
+        return self.writer.variant_from_string(s)
+
+    def close(self):
+        self.writer.close()
+
+
+class Profiler(object):
+    """
+    sample the line being run in the main thread every `interval` seconds
+    of CPU time using a profiling timer signal (unix only).
+    """
+
+    def __init__(self, interval=0.005):
+        import signal
+        self.counts = {}
+        self.running = hasattr(signal, "setitimer")
+        if not self.running:
+            print("profiling isn't supported on this platform", file=sys.stderr)
+            return
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, interval, interval)
+
+    def _sample(self, signum, frame):
+        if frame is None:
+            return
+        code = frame.f_code
+        # f_lineno can be None between lines.
+        key = "%s:%s(%s)" % (code.co_filename, frame.f_lineno, code.co_name)
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def stop(self):
+        if self.running:
+            import signal
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, signal.SIG_DFL)
+            self.running = False
+
+    def add(self, top):
+        for n, key in top:
+            self.counts[key] = self.counts.get(key, 0) + n
+
+    def top(self, n=30):
+        """the n most sampled lines as [count, file:line(function)]."""
+        return [[c, k] for k, c in sorted(self.counts.items(), key=lambda kv: -kv[1])[:n]]
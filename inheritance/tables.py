@@ -0,0 +1,101 @@
+"""
+Precomputed results of a model for every combination of genotypes in a small
+family.
+
+gt_types takes only 4 values (HOM_REF, HET, UNKNOWN, HOM_ALT as 0..3) so the
+genotypes of a family with n samples pack into a 2n-bit integer and the part
+of a model that depends only on genotypes is a lookup into a table of 4**n
+results. The remaining checks (depth, GQ, ...) are kept as a separate mask.
+
+>>> from inheritance import Sample, Family
+>>> mom, dad, kid = Sample('mom', False), Sample('dad', False), Sample('kid', True)
+>>> kid.mom, kid.dad = mom, dad
+>>> f = Family([mom, dad, kid], 'trio')
+>>> t = f.truth_table('de_novo', min_depth=10)
+>>> len(t.table), sum(t.table)
+(64, 2)
+>>> print(t.mask_filter)
+(gt_depths[kid] >= 10) and (gt_depths[mom] >= 10) and (gt_depths[dad] >= 10)
+>>> t.pack([0, 0, 1])
+16
+>>> t([0, 0, 1], gt_depths=[20, 20, 20]), t([0, 0, 1], gt_depths=[20, 2, 20])
+(True, False)
+"""
+from .expr import And, as_node, evaluate, fields, simplify
+
+
+class TruthTable(object):
+    """
+    The result of a filter (from a model of `family`) for every packed
+    genotype code of the family. Filters whose genotype checks can't be
+    separated from their other checks (e.g. de_novo with gt_ll) are not
+    supported.
+    """
+
+    def __init__(self, family, flt, max_samples=8):
+        n = len(family)
+        if n > max_samples:
+            raise ValueError("truth table for %d samples would need %d entries"
+                             % (n, 4 ** n))
+        if (family.HOM_REF, family.HET, family.UNKNOWN, family.HOM_ALT) != (0, 1, 2, 3):
+            raise ValueError("truth tables need genotypes coded as 0..3")
+
+        self.family = family
+        self.filter = flt
+        # the position of each sample (as named in the filter) in the family.
+        self.positions = {}
+        for i, s in enumerate(family.subjects):
+            self.positions[as_node(s.gt_types == 0).sample] = i
+
+        node = simplify(as_node(flt))
+        gts, mask = [], []
+        for c in (node.args if isinstance(node, And) else (node,)):
+            used = fields(c)
+            if used <= set(['gt_types']):
+                gts.append(c)
+            elif 'gt_types' not in used:
+                mask.append(c)
+            else:
+                raise ValueError("can't separate genotypes from other fields in %s" % flt)
+
+        self.genotypes = simplify(And(*gts)) if gts else True
+        self.mask = simplify(And(*mask)) if mask else True
+        self.mask_filter = None if self.mask is True else type(flt).render(self.mask)
+
+        table = self.table = bytearray(4 ** n)
+        positions = self.positions
+        for code in range(len(table)):
+            table[code] = bool(evaluate(self.genotypes,
+                lambda field, s: (code >> (2 * positions[s])) & 3))
+
+    def pack(self, gt_types):
+        """
+        the code for the genotypes of a variant. For a 2-D array (variants x
+        family samples) an array of codes.
+        """
+        if getattr(gt_types, 'ndim', 1) == 2:
+            import numpy as np
+            shifts = 2 * np.arange(gt_types.shape[1], dtype=np.int64)
+            return (gt_types.astype(np.int64) << shifts).sum(axis=1)
+        code = 0
+        for i, g in enumerate(gt_types):
+            code |= int(g) << (2 * i)
+        return code
+
+    def __call__(self, gt_types, **arrays):
+        """
+        evaluate for a single variant or, if gt_types is 2-D, for a block
+        of variants. arrays holds gt_depths, gt_quals, ... as needed by the
+        mask.
+        """
+        positions = self.positions
+        if getattr(gt_types, 'ndim', 1) == 2:
+            import numpy as np
+            res = np.frombuffer(self.table, dtype=bool)[self.pack(gt_types)]
+            if self.mask is not True:
+                res &= evaluate(self.mask, lambda field, s: np.asarray(arrays[field])[:, positions[s]])
+            return res
+
+        if not self.table[self.pack(gt_types)]:
+            return False
+        return bool(evaluate(self.mask, lambda field, s: arrays[field][positions[s]]))
@@ -0,0 +1,29 @@
+import io
+import random
+
+from inheritance import EvalFamily
+from inheritance.adaptive import Adaptive
+from .test_fuzz import make_fam
+
+def test_adaptive_same_result():
+    for i in range(20):
+        efam = make_fam(random.randint(1, 3), random.randint(1, 4), random.randint(0, 2), "a%d" % i)
+        n = len(efam.subjects)
+        for model in ('auto_rec', 'de_novo', 'comp_het', 'mendel_LOH'):
+            kwargs = dict(min_depth=20, min_gq=20)
+            a = Adaptive(efam, model, kwargs=kwargs, n=30)
+            p = efam.prepare(model, **kwargs)
+            for _ in range(60):
+                arrays = dict(gt_types=[random.choice((0, 0, 0, 1, 3)) for _ in range(n)],
+                              gt_depths=[random.randrange(0, 100) for _ in range(n)],
+                              gt_quals=[random.randrange(0, 100) for _ in range(n)])
+                assert bool(a(**arrays)) == bool(p(**arrays)), (model, a.filter)
+            assert a.counts is None
+
+            # re-using the learned rates gives the same order without learning.
+            fh = io.StringIO()
+            a.dump(fh)
+            fh.seek(0)
+            b = Adaptive(efam, model, kwargs=kwargs, n=30, rates=Adaptive.load(fh))
+            assert b.counts is None
+            assert b.filter == a.filter
@@ -0,0 +1,23 @@
+import random
+
+from inheritance.annotation import GeneFinder
+
+vep_keys = "Allele|Consequence|IMPACT|SYMBOL|Gene|Feature_type|Feature|BIOTYPE|CANONICAL".split("|")
+consequences = ['missense_variant', 'stop_gained', 'intron_variant', 'synonymous_variant',
+                'upstream_gene_variant', 'splice_region_variant&intron_variant',
+                'frameshift_variant', '3_prime_UTR_variant']
+biotypes = ['protein_coding', 'processed_pseudogene', 'lincRNA']
+
+def effect():
+    gene = random.choice(['', 'BRCA1', 'BRCA1', 'NBR2', 'TTN'])
+    return "|".join(['G', random.choice(consequences), 'X', gene, 'ENSG1', 'Transcript', 'ENST1',
+                     random.choice(biotypes), random.choice(['', 'YES'])])
+
+def test_fast_path_matches_sorting_effects():
+    for severity in (None, ('MED', 'HIGH'), ('HIGH',)):
+        finder = GeneFinder({'CSQ': vep_keys}, severity)
+        for i in range(500):
+            csq = ",".join(effect() for _ in range(random.randint(1, 5)))
+            assert finder.gene({'CSQ': csq}) == finder._slow('CSQ', csq.split(",")), (severity, csq)
+            # and from the cache.
+            assert finder.gene({'CSQ': csq}) == finder._slow('CSQ', csq.split(","))
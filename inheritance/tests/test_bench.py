@@ -0,0 +1,53 @@
+import numpy as np
+
+from inheritance.bench import simulate, harness
+
+
+def test_pedigree_shapes():
+    rows = simulate.cohort(5, generations=3, children=2)
+    assert len(rows) == 50
+    ids = set()
+    for family_id, sample_id, dad, mom, sex, phenotype in rows:
+        # parents come first.
+        assert dad == "0" or dad in ids
+        assert mom == "0" or mom in ids
+        ids.add(sample_id)
+    for i in range(5):
+        assert any(r[5] == "2" for r in rows if r[0] == "f%d" % i)
+
+
+def test_mendelian_transmission():
+    rows = simulate.cohort(20, generations=3, children=2)
+    gts = simulate.genotypes(rows, 500, np.random.default_rng(0), de_novo_rate=0,
+                             error_rate=0, missing_rate=0)
+    alts = np.array([0, 1, -1, 2])[gts]
+    index = dict((r[1], i) for i, r in enumerate(rows))
+    for i, (_, _, dad, mom, _, _) in enumerate(rows):
+        if dad == "0":
+            continue
+        d, m, k = alts[:, index[dad]], alts[:, index[mom]], alts[:, i]
+        # the kid can't have more alts than the parents can give or fewer
+        # than they must.
+        most = (d > 0).astype(int) + (m > 0)
+        least = (d == 2).astype(int) + (m == 2)
+        assert ((k <= most) & (k >= least)).all()
+
+
+def test_compare_flags_regressions():
+    base = {"results": {"eval/de_novo/trio/10/2000": {"variants_per_sec": 1000.0, "peak_rss_mb": 50.0}}}
+    results = [dict(kind="eval", model="de_novo", shape="trio", families=10, variants=2000,
+                    variants_per_sec=500.0, peak_rss_mb=50.0)]
+    lines, regressions = harness.compare(results, base)
+    assert regressions == 1 and "SLOWER" in lines[0]
+    results[0]["variants_per_sec"] = 900.0
+    assert harness.compare(results, base)[1] == 0
+    # runs with another number of variants aren't compared.
+    results[0].update(variants=500, variants_per_sec=500.0)
+    assert harness.compare(results, base) == ([], 0)
+
+
+def test_dominant_families():
+    rows = simulate.cohort(50, generations=3, children=2)
+    affected = set(r[1] for r in rows if r[5] == "2")
+    # some affected kids have an affected parent.
+    assert any(r[1] in affected and (r[2] in affected or r[3] in affected) for r in rows)
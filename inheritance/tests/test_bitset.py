@@ -0,0 +1,42 @@
+import random
+
+import numpy as np
+import pytest
+
+from inheritance.bitset import PackedGenotypes, BitsetEvaluator
+from inheritance.npeval import CohortEvaluator
+from .test_fuzz import make_fam
+
+def test_pack_round_trip():
+    for n_variants in (1, 63, 64, 65, 200):
+        gts = np.random.randint(0, 4, size=(n_variants, 7))
+        packed = PackedGenotypes.pack(gts)
+        assert (packed.unpack() == gts).all()
+        assert packed.lo.shape == (7, (n_variants + 63) // 64)
+
+    a, b = np.random.randint(0, 4, size=(64, 5)), np.random.randint(0, 4, size=(10, 5))
+    for blocks in ((a, b), (b, a)):
+        joined = PackedGenotypes.concatenate([PackedGenotypes.pack(x) for x in blocks])
+        assert (joined.unpack() == np.vstack(blocks)).all()
+    with pytest.raises(AssertionError):
+        PackedGenotypes.concatenate([])
+
+def test_bitset_matches_cohort():
+    fams, offset = {}, 0
+    for i in range(20):
+        efam = make_fam(random.randint(1, 3), random.randint(0, 4), random.randint(0, 2), "b%d" % i)
+        for s in efam.subjects:
+            s._i += offset
+        offset += len(efam.subjects)
+        fams[efam.family.family_id] = efam.family
+
+    n_variants = 150
+    gt_types = np.random.randint(0, 4, size=(n_variants, offset))
+    gt_depths = np.random.randint(0, 30, size=(n_variants, offset))
+    packed = PackedGenotypes.pack(gt_types)
+    for model in ('auto_rec', 'auto_dom', 'de_novo', 'x_rec', 'x_dom',
+                  'x_denovo', 'comp_het', 'mendel_LOH'):
+        for kwargs in ({}, {'min_depth': 10}):
+            expected = CohortEvaluator(fams, model, **kwargs)(gt_types, gt_depths=gt_depths)
+            res = BitsetEvaluator(fams, model, **kwargs)(packed, gt_depths=gt_depths)
+            assert (res == expected).all(), (model, kwargs)
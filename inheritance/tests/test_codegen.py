@@ -0,0 +1,39 @@
+import io
+import random
+
+from inheritance.codegen import compile_model, export
+from .test_fuzz import make_fam
+
+models = ('auto_rec', 'auto_dom', 'de_novo', 'comp_het', 'x_rec', 'x_dom',
+          'x_denovo', 'mendel_plausible_denovo', 'mendel_implausible_denovo',
+          'mendel_uniparental_disomy', 'mendel_LOH')
+
+def test_codegen_matches_eval():
+    for i in range(40):
+        efam = make_fam(random.randint(0, 3), random.randint(0, 4), random.randint(0, 2), "cg%d" % i)
+        if len(efam.subjects) == 0: continue
+        for model in models:
+            for kwargs in ({}, {'min_depth': 50, 'min_gq': 50}):
+                if not model.startswith('x_'):
+                    kwargs = dict(kwargs, gt_ll=50)
+                fn = compile_model(efam.family, model, kwargs)
+                for _ in range(10):
+                    n = len(efam.subjects)
+                    efam.gt_types = [random.randrange(0, 4) for _ in range(n)]
+                    efam.gt_depths = [random.randrange(0, 100) for _ in range(n)]
+                    efam.gt_quals = [random.randrange(0, 100) for _ in range(n)]
+                    expected = bool(getattr(efam, model)(**kwargs))
+                    assert fn(efam.gt_types, efam.gt_depths, efam.gt_quals,
+                              efam.gt_phred_ll_homref, efam.gt_phred_ll_het,
+                              efam.gt_phred_ll_homalt) == expected, (model, kwargs, fn.source)
+
+def test_codegen_export():
+    efam = make_fam(2, 2, 0, "export")
+    fns = [compile_model(efam.family, m) for m in ('auto_rec', 'de_novo')]
+    fh = io.StringIO()
+    export(fh, fns)
+    ns = {}
+    exec(fh.getvalue(), ns)
+    gts = [random.randrange(0, 4) for _ in efam.subjects]
+    for fn in fns:
+        assert ns[fn.__name__](gts) == fn(gts)
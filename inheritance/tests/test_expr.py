@@ -0,0 +1,52 @@
+import random
+
+from inheritance import Sample, Family
+from inheritance.expr import Cmp, common
+from .test_fuzz import make_fam
+
+def n_comparisons(node):
+    if isinstance(node, Cmp): return 1
+    return sum(n_comparisons(a) for a in getattr(node, 'args', ()))
+
+def test_simplify_shared_parents():
+    mom = Sample('mom', affected=False)
+    dad = Sample('dad', affected=False)
+    kids = [Sample('kid%d' % i, affected=True) for i in range(3)]
+    for k in kids:
+        k.mom, k.dad = mom, dad
+    f = Family([mom, dad] + kids, 'sibs')
+
+    flt = f.auto_rec()
+    simple = flt.simplify()
+    # parents are only checked for HET once.
+    assert n_comparisons(flt.node) == 11
+    assert n_comparisons(simple.node) == 7
+    assert simple.count("gt_types[mom] == 1") == 1
+
+    flt = f.de_novo()
+    assert n_comparisons(flt.simplify().node) < n_comparisons(flt.node)
+
+def test_simplify_common():
+    f = next(iter(Family.from_ped("""\
+1 dad 0 0 1 1
+1 mom 0 0 2 1
+1 kid dad mom 1 2""").values()))
+    node = f.mendel_LOH().simplify().node
+    assert Cmp('gt_types', 'kid', '==', 3) in common(node)
+
+def test_simplify_same_result():
+    for i in range(50):
+        efam = make_fam(random.randint(0, 3), random.randint(0, 4), random.randint(0, 2), "s%d" % i)
+        if len(efam.subjects) == 0: continue
+        f = efam.family
+        env = dict((s.sample_id, j) for j, s in enumerate(f.subjects))
+        for model in ('auto_rec', 'auto_dom', 'de_novo', 'comp_het', 'x_rec',
+                      'x_dom', 'mendel_LOH', 'mendel_uniparental_disomy'):
+            flt = getattr(f, model)(min_depth=50)
+            if not hasattr(flt, 'simplify'): continue
+            simple = flt.simplify()
+            for _ in range(20):
+                env['gt_types'] = [random.randrange(0, 4) for _ in f.subjects]
+                env['gt_depths'] = [random.randrange(0, 100) for _ in f.subjects]
+                env['gt_quals'] = [random.randrange(0, 100) for _ in f.subjects]
+                assert bool(eval(flt, env)) == bool(eval(simple, env)), (flt, simple)
@@ -517,3 +517,93 @@ def test_x_rec():
     # mom should be a carrier
     efam.gt_types = [Family.HOM_REF, Family.HOM_REF, Family.HOM_ALT]
     assert efam.x_rec()
+
+def test_prepare():
+    mom = Sample('mom', affected=False)
+    dad = Sample('dad', affected=False)
+    kid = Sample('kid', affected=True)
+    kid.mom, kid.dad = mom, dad
+
+    efam = EvalFamily(Family([mom, dad, kid], 'prep'))
+    efam.gt_types = [Family.HET, Family.HET, Family.HOM_ALT]
+    efam.gt_depths = [20, 20, 20]
+
+    auto_rec = efam.prepare('auto_rec', min_depth=10)
+    assert auto_rec is efam.prepare('auto_rec', min_depth=10)
+    assert auto_rec()
+    assert not auto_rec(gt_depths=[20, 20, 5])
+    code = auto_rec.code
+
+    # same pedigree, same compiled code.
+    mom.affected = False
+    assert auto_rec()
+    assert auto_rec.code is code
+
+    # changing the phenotype invalidates the compiled filter.
+    mom.affected = True
+    assert not auto_rec()
+    assert auto_rec.code is not code
+    mom.affected = False
+    assert auto_rec()
+
+def test_plan():
+    mom = Sample('mom', affected=False)
+    dad = Sample('dad', affected=False)
+    kid = Sample('kid', affected=True)
+    kid.mom, kid.dad = mom, dad
+    fam = Family([mom, dad, kid], 'plan')
+
+    plan = fam.plan('de_novo')
+    assert plan.feasible and not plan.reduced and plan.warnings == []
+    assert plan is fam.plan('de_novo')
+
+    # an affected parent means no de novo and is a warning for auto_rec.
+    mom.affected = True
+    assert fam.plan('de_novo') is not plan
+    assert not fam.plan('de_novo').feasible
+    assert not fam.plan('auto_rec').feasible
+    assert "affected parents" in fam.plan('auto_rec').warnings[0]
+
+    # auto_dom without strict tests an affected without parents.
+    single = Family([Sample('one', affected=True)], 'single')
+    assert single.plan('auto_dom', strict=False).reduced
+
+def test_role_cache():
+    mom = Sample('mom', affected=False, sex='female')
+    dad = Sample('dad', affected=False, sex='male')
+    kid = Sample('kid', affected=True)
+    kid.mom, kid.dad = mom, dad
+    fam = Family([mom, dad, kid], 'roles')
+    for i, s in enumerate(fam.subjects):
+        s._i = i
+
+    # changing a returned list doesn't change the family.
+    fam.affecteds.append(mom)
+    fam.unaffecteds.sort(key=lambda s: s.sample_id)
+    assert fam.affecteds == [kid] and fam.unaffecteds == [mom, dad]
+    assert fam.index('affecteds').tolist() == [2]
+    assert fam.index('moms').tolist() == [-1, -1, 0]
+    assert fam.index('dads').tolist() == [-1, -1, 1]
+    assert fam.index('males').tolist() == [1]
+
+    mom.affected = True
+    assert fam.index('affecteds').tolist() == [0, 2]
+    assert [s.sample_id for s in fam.unaffecteds] == ['dad']
+    kid.sex = 'male'
+    assert fam.index('males').tolist() == [1, 2]
+    kid.mom = None
+    assert fam.index('moms').tolist() == [-1, -1, -1]
+    assert fam.samples_with_parent == []
+    kid._i = 5
+    assert fam.index().tolist() == [0, 1, 5]
+
+    # a new list of subjects of the same length.
+    fam.subjects = [mom, dad, Sample('kid2', affected=False)]
+    assert fam.affecteds == [mom]
+
+def test_warn_once(capsys, monkeypatch):
+    from inheritance.inheritance import warn
+    monkeypatch.delenv('GEMINI_WARN_OFF', raising=False)
+    warn("a warning without a newline")
+    warn("a warning without a newline")
+    assert capsys.readouterr().err == "a warning without a newline\n"
@@ -0,0 +1,119 @@
+import pytest
+
+from inheritance.__main__ import merge_groups, shards
+
+class Header(object):
+    seqnames = ['1', '2']
+    seqlens = [1000, 10]
+
+def test_shards_cover_contigs():
+    regions = list(shards(Header(), 4))
+    assert [r for r in regions if r[0] == '2'] == [('2', 1, None, 1)]
+    one = [r for r in regions if r[0] == '1']
+    assert one[0][1] == 1 and one[-1][2] is None
+    for a, b in zip(one, one[1:]):
+        assert a[2] + 1 == b[1] == b[3]
+
+def test_merge_groups_across_shards():
+    shard_groups = [
+        [('A', set(['f1']), [('s1', 0, 10)], []), ('B', set(), [('s1', 10, 10)], [])],
+        [('B', set(['f2']), [('s2', 0, 5)], [])],
+        [],
+        [('B', set(['f3']), [('s4', 0, 5)], []), ('A', set(['f1']), [('s4', 5, 9)], [])],
+        [(None, set(), [('s5', 0, 0)], [])],
+        [(None, set(['f4']), [('s6', 0, 3)], [])],
+    ]
+    merged = list(merge_groups(shard_groups))
+    assert [m[0] for m in merged] == ['A', 'B', 'A', None]
+    assert [len(m[1]) for m in merged] == [1, 2, 1, 1]
+    assert merged[1][2] == [('s1', 10, 10), ('s2', 0, 5), ('s4', 0, 5)]
+
+def test_pairing_only_pairs_sites_of_a_family():
+    from inheritance.pyeval import Family
+    from inheritance.__main__ import Pairing
+    fams = Family.from_ped("""
+f1 dad 0 0 1 1
+f1 mom 0 0 2 1
+f1 kid dad mom 1 2
+f2 kid2 0 0 1 2""".strip())
+    pairing = Pairing(fams)
+    ref, alt = "A", "G"
+    # dad, mom, kid: kid gets the alt from mom at the first site and dad at
+    # the second.
+    s1 = ("1:1:A:G", ref, alt, [("f1", [0, 1, 1], ["A/A", "A/G", "A/G"], [False] * 3)])
+    s2 = ("1:2:A:G", ref, alt, [("f1", [1, 0, 1], ["A/G", "A/A", "A/G"], [False] * 3)])
+    # a site that only passed for f2 is not paired with f1 sites.
+    s3 = ("1:3:A:G", ref, alt, [("f2", [1], ["A/G"], [False])])
+    found = pairing.pairs([s1, s2, s3])
+    assert found == {0: [("f1", "1:2:A:G", 1)], 1: [("f1", "1:1:A:G", 1)]}
+
+def _simulated(tmpdir, n_variants=200, n_families=5):
+    from inheritance.bench import simulate
+    rows = simulate.cohort(n_families)
+    ped, vcf = str(tmpdir.join("t.ped")), str(tmpdir.join("t.vcf"))
+    with open(ped, "w") as fh:
+        simulate.write_ped(fh, rows)
+    with open(vcf, "w") as fh:
+        simulate.write_vcf(fh, rows, n_variants)
+    return ped, vcf
+
+def test_processes_without_contigs(tmpdir, capsys):
+    # a header without ##contig lines has no regions to shard.
+    from inheritance.__main__ import run
+    ped, vcf = _simulated(tmpdir)
+    lines = [l for l in open(vcf) if not l.startswith("##contig")]
+    with open(vcf, "w") as fh:
+        fh.writelines(lines)
+    outs = []
+    for processes in (1, 2):
+        out = str(tmpdir.join("out%d.vcf" % processes))
+        run("de_novo", ped, vcf, 5, 5, 0, None, processes=processes, output=out)
+        outs.append([l for l in open(out) if not l.startswith("#")])
+    assert outs[0] == outs[1]
+    assert "no contigs" in capsys.readouterr().err
+
+def _indexed(tmpdir, n_variants, n_families=5):
+    pysam = pytest.importorskip("pysam")
+    ped, vcf = _simulated(tmpdir, n_variants, n_families)
+    return ped, pysam.tabix_index(vcf, preset="vcf", force=True)
+
+def test_processes_match_serial(tmpdir):
+    # 24 shards of ~8kb over records ~100bp apart in genes of 20 so many
+    # genes span 2 shards.
+    from inheritance.__main__ import run
+    ped, vcf = _indexed(tmpdir, 1000, 20)
+    for model in ("de_novo", "auto_rec", "auto_dom", "comp_het", "x_rec"):
+        for min_kindreds in (0, 2):
+            outs = []
+            for processes in (1, 3):
+                out = str(tmpdir.join("out%d.vcf" % processes))
+                run(model, ped, vcf, 5, 5, min_kindreds, None, processes=processes, output=out)
+                outs.append([l for l in open(out) if not l.startswith("#")])
+            assert outs[0] and outs[0] == outs[1], (model, min_kindreds)
+
+def test_processes_error_removes_spools(tmpdir, monkeypatch):
+    import tempfile
+    from inheritance import __main__ as main
+    ped, vcf = _indexed(tmpdir, 1000)
+    spools = tmpdir.mkdir("spools")
+    monkeypatch.setattr(tempfile, "tempdir", str(spools))
+    calls = []
+
+    def write_group(*args):
+        calls.append(args)
+        if len(calls) == 3:
+            raise IOError("disk full")
+    monkeypatch.setattr(main, "write_group", write_group)
+    with pytest.raises(IOError):
+        main.run("de_novo", ped, vcf, 5, 5, 2, None, processes=3,
+                 output=str(tmpdir.join("out.vcf")))
+    assert spools.listdir() == []
+
+def test_prefilter_report_only_when_asked(tmpdir, capsys):
+    from inheritance.__main__ import run
+    ped, vcf = _simulated(tmpdir)
+    out = str(tmpdir.join("out.vcf"))
+    run("de_novo", ped, vcf, 5, 5, 0, None, output=out)
+    assert "prefilter" not in capsys.readouterr().err
+    run("de_novo", ped, vcf, 5, 5, 0, None, output=out, filters=dict(pass_only=True))
+    assert "FILTER=20" in capsys.readouterr().err
@@ -0,0 +1,145 @@
+import random
+
+import numpy as np
+
+from inheritance import Sample, Family, EvalFamily
+from inheritance.npeval import BlockFamily
+from .test_fuzz import make_fam
+
+n_variants = 40
+
+def block(n_samples, lo, hi):
+    return np.array([[random.randrange(lo, hi) for _ in range(n_samples)]
+                     for _ in range(n_variants)])
+
+def check(efam, bfam, model, **kwargs):
+    res = getattr(bfam, model)(**kwargs)
+    assert res.shape == (n_variants,), (model, res)
+    for i in range(n_variants):
+        efam.gt_types = list(bfam.gt_types[i])
+        efam.gt_depths = list(bfam.gt_depths[i])
+        efam.gt_quals = list(bfam.gt_quals[i])
+        efam.gt_phred_ll_homref = list(bfam.gt_phred_ll_homref[i])
+        efam.gt_phred_ll_het = list(bfam.gt_phred_ll_het[i])
+        efam.gt_phred_ll_homalt = list(bfam.gt_phred_ll_homalt[i])
+        assert bool(getattr(efam, model)(**kwargs)) == res[i], (model, kwargs, i)
+
+def test_block_matches_eval():
+    for i in range(40):
+        n_affecteds, n_unaffecteds, n_unknowns = random.randint(1, 3), random.randint(0, 4), random.randint(0, 2)
+        efam = make_fam(n_affecteds, n_unaffecteds, n_unknowns, "np%d" % i)
+        n = len(efam.subjects)
+        bfam = BlockFamily(efam.family)
+        bfam.gt_types = block(n, 0, 4)
+        bfam.gt_depths = block(n, 0, 30)
+        bfam.gt_quals = block(n, 0, 30)
+        bfam.gt_phred_ll_homref = block(n, 0, 30)
+        bfam.gt_phred_ll_het = block(n, 0, 30)
+        bfam.gt_phred_ll_homalt = block(n, 0, 30)
+
+        for kwargs in ({}, {'min_depth': 10, 'min_gq': 10}):
+            for model in ('x_rec', 'x_dom', 'x_denovo'):
+                check(efam, bfam, model, **kwargs)
+            for model in ('auto_rec', 'auto_dom', 'de_novo', 'comp_het',
+                          'mendel_plausible_denovo', 'mendel_implausible_denovo',
+                          'mendel_uniparental_disomy', 'mendel_LOH'):
+                check(efam, bfam, model, **kwargs)
+                check(efam, bfam, model, only_affected=False, gt_ll=15, **kwargs)
+
+def test_block_constant_filter():
+    kid = Sample('kid', affected=False)
+    bfam = BlockFamily(Family([kid], 'unaffected'))
+    bfam.gt_types = np.ones((5, 1), dtype=int)
+    assert not bfam.auto_rec().any()
+    assert bfam.auto_rec().shape == (5,)
+
+    # a single variant is treated as a block of 1.
+    assert bfam.prepare('auto_rec')(gt_types=[3]).shape == (1,)
+
+def test_cohort_matches_families():
+    from inheritance.npeval import CohortEvaluator
+
+    fams, offset = {}, 0
+    for i in range(20):
+        efam = make_fam(random.randint(1, 3), random.randint(0, 4), random.randint(0, 2), "c%d" % i)
+        for s in efam.subjects:
+            s._i += offset
+        offset += len(efam.subjects)
+        fams[efam.family.family_id] = efam.family
+
+    gt_types = block(offset, 0, 4)
+    gt_depths = block(offset, 0, 30)
+    for model in ('auto_rec', 'auto_dom', 'de_novo', 'x_rec', 'comp_het'):
+        cohort = CohortEvaluator(fams, model, min_depth=10)
+        res = cohort(gt_types, gt_depths=gt_depths)
+        assert res.shape == (len(fams), n_variants)
+        for k, fam in enumerate(fams.values()):
+            idxs = [s._i for s in fam.subjects]
+            bfam = BlockFamily(fam)
+            expected = bfam.prepare(model, min_depth=10)(gt_types=gt_types[:, idxs],
+                                                         gt_depths=gt_depths[:, idxs])
+            assert (res[k] == expected).all(), (model, k)
+            # and 1 variant at a time.
+            for i in range(n_variants):
+                assert cohort(gt_types[i], gt_depths=gt_depths[i])[k] == expected[i]
+
+def test_models_match_cohort():
+    from inheritance.npeval import CohortEvaluator, ModelsEvaluator
+
+    fams, offset = {}, 0
+    for i in range(20):
+        efam = make_fam(random.randint(1, 3), random.randint(0, 4), random.randint(0, 2), "m%d" % i)
+        for s in efam.subjects:
+            s._i += offset
+        offset += len(efam.subjects)
+        fams[efam.family.family_id] = efam.family
+
+    models = ('auto_rec', 'auto_dom', 'de_novo', 'x_rec', 'x_dom', 'x_denovo', 'comp_het')
+    gt_types = block(offset, 0, 4)
+    gt_depths = block(offset, 0, 30)
+    gt_quals = block(offset, 0, 30)
+    ev = ModelsEvaluator(fams, models, min_depth=10, min_gq=10)
+    cohorts = [CohortEvaluator(fams, m, min_depth=10, min_gq=10) for m in models]
+    for i in range(n_variants):
+        res = ev(gt_types[i], gt_depths=gt_depths[i], gt_quals=gt_quals[i])
+        assert res.shape == (len(models), len(fams))
+        for j, cohort in enumerate(cohorts):
+            assert (res[j] == cohort(gt_types[i], gt_depths=gt_depths[i], gt_quals=gt_quals[i])).all()
+
+def test_cohort_skips_non_carriers():
+    from inheritance.npeval import CohortEvaluator
+
+    fams, offset = {}, 0
+    for i in range(20):
+        efam = make_fam(random.randint(1, 3), random.randint(0, 4), random.randint(0, 2), "s%d" % i)
+        for s in efam.subjects:
+            s._i += offset
+        offset += len(efam.subjects)
+        fams[efam.family.family_id] = efam.family
+
+    # mostly HOM_REF so most families have no affected with an alt allele.
+    gt_types = block(offset, 0, 4) * (block(offset, 0, 8) == 0)
+    gt_depths = block(offset, 0, 30)
+    for model in ('auto_rec', 'auto_dom', 'de_novo', 'x_denovo', 'comp_het'):
+        cohort = CohortEvaluator(fams, model, min_depth=10)
+        assert cohort.carriers is not None, model
+        expected = cohort(gt_types, gt_depths=gt_depths)
+        for i in range(n_variants):
+            assert (cohort(gt_types[i], gt_depths=gt_depths[i]) == expected[:, i]).all(), model
+        # tracebacks and profiles name the cohort.
+        codes = list(cohort._each.values()) + [cohort._scalar, cohort._block]
+        assert set(c.co_filename for c in codes) == set(["<cohort:%s>" % model])
+
+def test_cohort_without_families():
+    from inheritance.npeval import CohortEvaluator
+
+    for model in ('auto_rec', 'de_novo', 'comp_het'):
+        cohort = CohortEvaluator({}, model)
+        assert cohort(np.zeros(0, dtype=int)).shape == (0,)
+        assert cohort(np.zeros((3, 0), dtype=int)).shape == (0, 3)
+
+def test_models_without_families():
+    from inheritance.npeval import ModelsEvaluator
+
+    ev = ModelsEvaluator({}, ('de_novo', 'auto_rec'))
+    assert ev(np.zeros(0, dtype=int)).shape == (2, 0)
@@ -0,0 +1,117 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+from inheritance import Family
+from inheritance.bench import simulate
+from inheritance.pedigree import PedError, Pedigree, cached_read_ped, read_ped, roles
+
+
+def _cohort():
+    rows = simulate.cohort(20, generations=3, children=2)
+    # a vcf with the samples in a different order and a parent outside the family.
+    names = [r[1] for r in rows]
+    random.Random(1).shuffle(names)
+    order = dict((n, i) for i, n in enumerate(names))
+    rows[-1] = rows[-1][:2] + ('f0_0',) + rows[-1][3:]
+    return rows, order
+
+
+def test_from_columns_matches_from_ped():
+    rows, order = _cohort()
+    fams = Family.from_ped("\n".join(" ".join(r) for r in rows), order=order)
+    ped = Pedigree.from_columns(*zip(*rows), order=order)
+    assert len(ped) == len(rows)
+    assert ped.family_ids == sorted(fams, key=lambda f: int(f[1:]))
+
+    copies = Family.from_pedigree(ped)
+    for family_id, fam in fams.items():
+        assert copies[family_id].pedigree_key() == fam.pedigree_key()
+        view = ped[family_id]
+        for role in roles + ('moms', 'dads'):
+            assert view.index(role).tolist() == fam.index(role).tolist(), (family_id, role)
+
+
+def test_from_families():
+    rows, order = _cohort()
+    fams = Family.from_ped("\n".join(" ".join(r) for r in rows), order=order)
+    ped = Pedigree.from_families(fams)
+    assert sorted(ped.family_ids) == sorted(fams)
+    assert ped.nbytes > 0
+    for view in ped:
+        assert Family.from_pedigree(ped, [view.family_id])[view.family_id].pedigree_key() == \
+            fams[view.family_id].pedigree_key()
+    assert np.array_equal(ped.mask('affecteds'), ped.affected == 2)
+
+
+def test_empty():
+    ped = Pedigree.from_columns([], [], [], [], [], [])
+    assert len(ped) == 0 and list(ped) == [] and Family.from_pedigree(ped) == {}
+
+
+def test_read_ped():
+    rows, order = _cohort()
+    lines = ["#family_id sample_id paternal_id maternal_id sex phenotype"]
+    lines.extend("\t".join(r + ("extra",)) if i % 7 == 0 else " ".join(r) for i, r in enumerate(rows))
+    # the first sample's id needs fixing as in from_ped.
+    text = "\n".join(lines).replace("f0_0", "f0-0")
+    fams = Family.from_ped(text, order=order)
+    # from_ped fails on blank lines.
+    lines.insert(10, "")
+    text = "\n".join(lines).replace("f0_0", "f0-0")
+    for chunk_size in (100, 1 << 22):
+        ped = read_ped(text, order=order, chunk_size=chunk_size)
+        copies = Family.from_pedigree(ped)
+        assert list(copies) == list(fams)
+        for family_id, fam in fams.items():
+            assert repr(copies[family_id]) == repr(fam)
+            assert copies[family_id].pedigree_key() == fam.pedigree_key()
+
+
+def test_read_ped_unicode_whitespace():
+    ped = read_ped(u"f1 dad 0 0 1 1\nf1\u00a0kid dad 0 1 2\n")
+    assert ped.sample_ids.tolist() == ["dad", "kid"] and ped.dad.tolist() == [-1, 0]
+
+
+def test_read_ped_errors():
+    text = "\n".join(["f1 dad 0 0 1 1",
+                      "f1 kid dad mom",
+                      "f1 dad 0 0 1 1",
+                      "f2 dad 0 0 1 1",
+                      "f2 loop loop 0 1 2"])
+    with pytest.raises(PedError) as e:
+        read_ped(text, order={"dad": 0, "loop": 1}, chunk_size=10)
+    assert e.value.errors == [
+        "line 2: expected at least 6 columns, found 4",
+        "line 3: sample dad is repeated in family f1 (first on line 1)",
+        "line 5: sample loop is its own parent"]
+    with pytest.raises(PedError) as e:
+        read_ped("f1 dad 0 0 1 1", order={})
+    assert e.value.errors == ["line 1: sample dad is not in the VCF"]
+
+
+def test_cached_read_ped(tmpdir):
+    rows, order = _cohort()
+    ped = str(tmpdir.join("c.ped"))
+    with open(ped, "w") as fh:
+        simulate.write_ped(fh, rows)
+    samples = sorted(order, key=order.get)
+    cache = str(tmpdir.join("cache"))
+
+    made = cached_read_ped(ped, samples, cache)
+    loaded = cached_read_ped(ped, samples, cache)
+    assert isinstance(loaded.index.base, np.memmap)
+    assert len(os.listdir(cache)) == 1
+    fams = Family.from_ped(ped, order=order)
+    for p in (made, loaded):
+        copies = Family.from_pedigree(p)
+        assert all(copies[f].pedigree_key() == fams[f].pedigree_key() for f in fams)
+
+    # new samples or a changed PED make a new copy.
+    assert cached_read_ped(ped, samples[::-1], cache).index.tolist() != loaded.index.tolist()
+    with open(ped, "a") as fh:
+        fh.write("new kid 0 0 1 2\n")
+    assert "new" in cached_read_ped(ped, samples + ["kid"], cache).family_ids
+    assert len(os.listdir(cache)) == 3
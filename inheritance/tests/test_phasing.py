@@ -0,0 +1,85 @@
+import numpy as np
+
+from inheritance import Family
+from inheritance.pedigree import Pedigree
+from inheritance.phasing import genotype_arrays, genotype_types, phase, trios
+
+
+def _family():
+    return Family.from_ped("""\
+f1 dad 0 0 1 1
+f1 mom 0 0 2 1
+f1 kid dad mom 1 2
+f1 kid2 dad mom 2 1
+f1 other 0 mom 2 1""")["f1"]
+
+
+def test_trios():
+    fam = _family()
+    kids, moms, dads = trios(fam)
+    assert kids.tolist() == [2, 3] and moms.tolist() == [1, 1] and dads.tolist() == [0, 0]
+    for t, u in zip(trios(Pedigree.from_families({"f1": fam})), (kids, moms, dads)):
+        assert t.tolist() == u.tolist()
+    assert [len(x) for x in trios([])] == [0, 0, 0]
+
+
+def test_phase_matches_famphase():
+    fam = _family()
+    rng = np.random.default_rng(3)
+    bases = np.array(["A", "C"])
+    alleles = rng.integers(0, 2, size=(2000, 5, 2))
+    alleles[rng.random((2000, 5)) < 0.05] = -1
+    phased, phases = phase(alleles, *trios(fam))
+
+    for a, p, q in zip(alleles, phased, phases):
+        gt_types = [2 if x[0] < 0 else int(t) for x, t in zip(a, genotype_types(a[:, 0], a[:, 1]))]
+        gt_bases = ["./." if x[0] < 0 else "%s/%s" % tuple(bases[x]) for x in a]
+        expected_phases, expected_bases = fam.famphase(gt_types, [False] * 5, gt_bases)
+        assert q.tolist() == expected_phases
+        assert ["%s%s%s" % (bases[x[0]], "|" if f else "/", bases[x[1]]) if x[0] >= 0 else "./."
+                for x, f in zip(p, q)] == expected_bases
+
+
+def test_phase_multiallelic():
+    # mom 0/0, dad 1/2 and kid 0/2: dad gave the 2.
+    alleles = np.array([[[0, 0], [1, 2], [2, 0]],
+                        # mom 1/1, dad 2/2 and kid 2/1.
+                        [[1, 1], [2, 2], [2, 1]],
+                        # mom 0/1, dad 0/2 and kid 2/1.
+                        [[0, 1], [0, 2], [2, 1]],
+                        # mom 1/2, dad 1/2 and kid 1/2: either way.
+                        [[1, 2], [1, 2], [1, 2]]])
+    phased, phases = phase(alleles, [2], [0], [1], phases=np.zeros((4, 3), dtype=bool))
+    assert phased[:, 2].tolist() == [[0, 2], [1, 2], [1, 2], [1, 2]]
+    assert phases[:, 2].tolist() == [True, True, True, False]
+    assert not phases[:, :2].any()
+    # the input isn't changed.
+    assert alleles[0, 2].tolist() == [2, 0]
+
+
+def test_genotype_arrays(tmpdir):
+    from cyvcf2 import VCF
+    path = str(tmpdir.join("p.vcf"))
+    with open(path, "w") as fh:
+        fh.write("""##fileformat=VCFv4.2
+##contig=<ID=1>
+##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">
+#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tmom\tdad\tkid
+1\t10\t.\tA\tG,T\t50\tPASS\t.\tGT\t1/1\t2/2\t2|1
+1\t20\t.\tA\tG\t50\tPASS\t.\tGT\t1\t0\t1
+1\t30\t.\tA\tG\t50\tPASS\t.\tGT\t0/0\t1\t0/1
+1\t40\t.\tA\tG\t50\tPASS\t.\tGT\t0/1/1\t1/1\t0/1
+1\t50\t.\tA\tG\t50\tPASS\t.\tGT\t0/0\t1/1\t./.
+1\t60\t.\tA\tG\t50\tPASS\t.\tGT\t0/0\t1/1\t1/0
+""")
+    alleles, phases = genotype_arrays(VCF(path))
+    assert alleles.shape == (6, 3, 2)
+    assert alleles[:, 2].tolist() == [[2, 1], [1, -1], [0, 1], [0, 1], [-1, -1], [1, 0]]
+    # haploid and triploid calls are missing.
+    assert alleles[1, 0, 1] < 0 and alleles[2, 1, 1] < 0 and (alleles[3, 0] < 0).all()
+    assert phases[:, 2].tolist() == [True, False, False, False, False, False]
+
+    phased, phases = phase(alleles, [2], [0], [1], phases)
+    assert phases[:, 2].tolist() == [True, False, False, False, False, True]
+    assert phased[5, 2].tolist() == [0, 1]
+    assert [len(a) for a in genotype_arrays([])] == [0, 0]
@@ -0,0 +1,46 @@
+import numpy as np
+
+from inheritance.pyeval import Family
+from inheritance.prefilter import Prefilter, carrier_columns
+
+fams = Family.from_ped("""
+f1 dad 0 0 1 1
+f1 mom 0 0 2 1
+f1 kid dad mom 1 2
+f2 kid2 0 0 1 2""".strip(), order={'dad': 0, 'mom': 1, 'kid': 2, 'kid2': 3})
+
+
+class Variant(object):
+    def __init__(self, FILTER=None, INFO=None, gt_types=(0, 0, 0, 0)):
+        self.FILTER, self.INFO = FILTER, INFO or {}
+        self.gt_types = np.array(gt_types)
+
+
+def test_carrier_columns():
+    for model in ("auto_rec", "comp_het"):
+        assert carrier_columns(fams, [model]).tolist() == [2, 3], model
+    # f2 (no parents) can't match de_novo and no family can match auto_dom.
+    assert carrier_columns(fams, ["de_novo"]).tolist() == [2]
+    assert carrier_columns(fams, ["auto_dom"]).tolist() == []
+    assert carrier_columns(fams, ["de_novo", "auto_rec"]).tolist() == [2, 3]
+
+
+def test_carrier_check():
+    p = Prefilter(carriers=carrier_columns(fams, ["auto_rec"]))
+    assert not p.carrier(Variant(gt_types=(1, 1, 0, 2)))
+    assert p.carrier(Variant(gt_types=(0, 0, 0, 3)))
+    assert p.counts == {"no affected carrier": 1}
+
+
+def test_sites_counts():
+    p = Prefilter(pass_only=True, max_ac=2, max_af=0.1, popfreq_field="gnomad_af", max_popfreq=0.01)
+    variants = [Variant("LowQual"), Variant(INFO={"AC": 3}), Variant(INFO={"AF": (0.5, 0.05)}),
+                Variant(INFO={"AF": (0.5, 0.2)}), Variant(INFO={"gnomad_af": 0.02}),
+                Variant(INFO={"AC": 1, "gnomad_af": 0.001})]
+    kept = list(p.sites(variants))
+    # missing fields don't remove a record and the lowest allele is used.
+    assert kept == [variants[2], variants[5]]
+    assert p.seen == 6
+    assert dict(p.counts) == {"FILTER": 1, "AC": 1, "AF": 1, "gnomad_af": 1}
+    p.update(4, {"FILTER": 2, "AC": 0, "AF": 0, "gnomad_af": 1})
+    assert p.seen == 10 and p.counts["FILTER"] == 3
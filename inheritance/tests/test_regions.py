@@ -0,0 +1,17 @@
+from inheritance.regions import read_bed, read_genes, gene_intervals, merge
+
+def test_gene_intervals(tmpdir):
+    bed = tmpdir.join("genes.bed")
+    bed.write("#chrom\tstart\tend\tname\n1\t99\t200\tBRCA2\n1\t150\t300\tZAR1L\n2\t0\t10\tTTN\n")
+    assert list(read_bed(str(bed))) == [('1', 100, 200), ('1', 151, 300), ('2', 1, 10)]
+    intervals = gene_intervals(str(bed), ['BRCA2', 'ZAR1L', 'NOPE'])
+    assert merge(intervals, ['1', '2']) == [('1', 100, 300, 0)]
+
+    genes = tmpdir.join("genes.txt")
+    genes.write("BRCA2\nTTN\n")
+    assert read_genes(str(genes)) == ['BRCA2', 'TTN']
+    assert read_genes("BRCA2,TTN") == ['BRCA2', 'TTN']
+
+def test_merge_order_and_first():
+    regions = merge([('2', 5, 10), ('1', 20, 30), ('X', 1, 2), ('1', 1, 10), ('1', 11, 12)], ['1', '2'])
+    assert regions == [('1', 1, 12, 0), ('1', 20, 30, 13), ('2', 5, 10, 0)]
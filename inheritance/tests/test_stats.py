@@ -0,0 +1,56 @@
+import numpy as np
+
+from inheritance.pyeval import Family
+from inheritance.npeval import CohortEvaluator, ModelsEvaluator
+from inheritance.stats import Stats
+
+fams = Family.from_ped("""
+f1 dad 0 0 1 1
+f1 mom 0 0 2 1
+f1 kid dad mom 1 2
+f2 kid2 0 0 1 2""".strip(), order={'dad': 0, 'mom': 1, 'kid': 2, 'kid2': 3})
+
+variants = [np.array(g) for g in ([0, 0, 1, 1], [0, 0, 0, 0], [1, 1, 3, 0], [0, 0, 1, 0])]
+
+
+def test_counts_single_model():
+    stats = Stats()
+    cohort = stats.cohort(CohortEvaluator(fams, 'de_novo'))
+    for g in variants:
+        cohort(g)
+    stats.stop()
+    d = stats.as_dict()
+    assert d["variants"] == 4
+    assert d["models"]["de_novo"]["passes"] == 2
+    # families without an affected carrier aren't evaluated and f2 (no
+    # parents) can't match de_novo so it never is.
+    assert d["families"]["f1"] == {"evaluated": 3, "passes": {"de_novo": 2}}
+    assert d["families"]["f2"]["evaluated"] == 0
+
+
+def test_counts_models_and_add():
+    stats = Stats()
+    cohort = stats.cohort(ModelsEvaluator(fams, ('de_novo', 'auto_rec')))
+    for g in variants:
+        cohort(g)
+    d = stats.as_dict()
+    assert d["models"]["auto_rec"]["passes"] == 1
+    assert d["families"]["f1"]["passes"] == {"de_novo": 2, "auto_rec": 1}
+
+    # e.g. the statistics from a worker process.
+    stats.add(d)
+    d = stats.as_dict()
+    assert d["variants"] == 8
+    assert d["families"]["f1"]["passes"] == {"de_novo": 4, "auto_rec": 2}
+
+    # the peak memory is that of the largest process.
+    own = d["peak_rss_mb"]
+    stats.add(dict(d, peak_rss_mb=own + 1000))
+    assert stats.as_dict()["peak_rss_mb"] == round(own + 1000, 1)
+
+
+def test_timed():
+    stats = Stats()
+    assert list(stats.timed(iter(range(5)), "decode")) == list(range(5))
+    assert stats.gene(lambda v: "G%d" % v)(3) == "G3"
+    assert stats.seconds["decode"] >= 0 and stats.seconds["gene"] >= 0
@@ -0,0 +1,37 @@
+import random
+
+import numpy as np
+
+from .test_fuzz import make_fam
+
+n_variants = 40
+
+models = ('auto_rec', 'auto_dom', 'de_novo', 'comp_het', 'x_rec', 'x_dom',
+          'x_denovo', 'mendel_plausible_denovo', 'mendel_LOH')
+
+def test_table_matches_eval():
+    for i in range(30):
+        efam = make_fam(random.randint(1, 3), random.randint(0, 3), random.randint(0, 1), "tt%d" % i)
+        f, n = efam.family, len(efam.family)
+        gts = np.random.randint(0, 4, size=(n_variants, n))
+        depths = np.random.randint(0, 30, size=(n_variants, n))
+        quals = np.random.randint(0, 30, size=(n_variants, n))
+        for model in models:
+            for kwargs in ({}, {'min_depth': 10}, {'min_gq': 10}):
+                table = f.truth_table(model, **kwargs)
+                block = table(gts, gt_depths=depths, gt_quals=quals)
+                for j in range(n_variants):
+                    efam.gt_types, efam.gt_depths = list(gts[j]), list(depths[j])
+                    efam.gt_quals = list(quals[j])
+                    expected = bool(getattr(efam, model)(**kwargs))
+                    assert table(list(gts[j]), gt_depths=list(depths[j]),
+                                 gt_quals=list(quals[j])) == expected, (model, kwargs, j)
+                    assert block[j] == expected, (model, kwargs, j)
+
+def test_table_cache():
+    efam = make_fam(1, 2, 0, "cache")
+    f = efam.family
+    t = f.truth_table('auto_rec')
+    assert f.truth_table('auto_rec') is t
+    f.subjects[1].affected = True
+    assert f.truth_table('auto_rec') is not t
@@ -0,0 +1,46 @@
+import pytest
+
+from inheritance.writer import BackgroundWriter
+
+
+class Collect(object):
+    def __init__(self, fail_at=None):
+        self.records, self.closed, self.fail_at = [], False, fail_at
+
+    def write_record(self, v):
+        if v == self.fail_at:
+            raise ValueError("bad record %d" % v)
+        self.records.append(v)
+
+    def close(self):
+        self.closed = True
+
+
+def test_writes_in_order():
+    w = Collect()
+    with BackgroundWriter(w, batch_size=7, max_batches=2) as out:
+        for i in range(1000):
+            out.write_record(i)
+    assert w.records == list(range(1000))
+    assert w.closed
+
+
+def test_error_from_thread():
+    w = Collect(fail_at=10)
+    out = BackgroundWriter(w, batch_size=4, max_batches=1)
+    with pytest.raises(ValueError):
+        for i in range(1000):
+            out.write_record(i)
+        out.close()
+    assert w.records == list(range(10))
+
+
+def test_error_in_with_block_is_kept():
+    w = Collect(fail_at=1)
+    with pytest.raises(KeyError):
+        with BackgroundWriter(w, batch_size=2) as out:
+            for i in range(4):
+                out.write_record(i)
+            # e.g. an error evaluating the next record.
+            raise KeyError("evaluation")
+    assert w.closed
@@ -0,0 +1,86 @@
+"""
+Write records from a background thread so that formatting and compressing
+output doesn't hold up evaluation.
+
+Records are collected in batches and handed to a single writer thread
+through a bounded queue so they are written in the order given and memory
+use is limited to `max_batches` batches.
+"""
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+class BackgroundWriter(object):
+    """
+    wrap a cyvcf2.Writer so that write_record only queues the record. close
+    (or leaving a with block) writes what's left, waits for the thread and
+    closes the writer. An error from the thread is raised by the next
+    write_record or by close, but not when leaving a with block because of
+    another error.
+    """
+
+    def __init__(self, writer, batch_size=256, max_batches=16):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.batch = []
+        self.error = None
+        self.queue = queue.Queue(max_batches)
+        self.thread = threading.Thread(target=self._write, name="vcf-writer")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _write(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            if self.error is not None:
+                # keep taking batches so the producer isn't blocked.
+                continue
+            try:
+                for variant in batch:
+                    self.writer.write_record(variant)
+            except Exception as e:
+                self.error = e
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def write_record(self, variant):
+        self.batch.append(variant)
+        if len(self.batch) >= self.batch_size:
+            self._check()
+            self.queue.put(self.batch)
+            self.batch = []
+
+    def variant_from_string(self, s):
+        return self.writer.variant_from_string(s)
+
+    def close(self, check=True):
+        """
+        write what's left and close the writer. With check, raise the error
+        of the thread, if any.
+        """
+        if self.thread is None:
+            return
+        if self.batch:
+            self.queue.put(self.batch)
+            self.batch = []
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        self.writer.close()
+        if check:
+            self._check()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # don't hide an error from the with block with one from the thread.
+        self.close(check=exc_type is None)
@@ -20,7 +20,8 @@ def get_version():
 setup(version=get_version(),
       name='inheritance',
       description="inheritance models for mendelian genetics",
-      packages=['inheritance', 'inheritance.tests'],
+      packages=['inheritance', 'inheritance.tests', 'inheritance.bench'],
+      package_data={'inheritance.bench': ['baseline.json']},
       url="https://github.com/brentp/inheritance",
       long_description=open('README.md').read(),
       author="Brent Pedersen",